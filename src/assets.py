@@ -0,0 +1,138 @@
+"""
+Process-wide registry of UI images and fonts.
+
+Each asset is decoded once and the same QPixmap / QIcon is handed to every
+widget that asks for it. Assets are read from resources/ui.pack, a single
+packed file built by running this module, and fall back to the loose files
+in resources/ when the pack is missing (e.g. when running from a fresh
+checkout). Paths are resolved relative to the program, not the working
+directory. Frozen builds bundle only the pack; other resources (the
+wallpaper) are looked up in resources/ next to the executable.
+
+    python3 assets.py    # rebuild resources/ui.pack
+"""
+import json
+import struct
+import sys
+from os import path
+from PyQt6.QtGui import QFontDatabase, QIcon, QPixmap
+
+BASE_DIR = getattr(sys, "_MEIPASS", path.dirname(path.abspath(__file__)))
+EXECUTABLE_DIR = (
+    path.dirname(path.abspath(sys.executable)) if getattr(sys, "frozen", False) else BASE_DIR
+)
+PACK_NAME = "ui.pack"
+PACK_MAGIC = b"FASEMOPK"
+PACKED_ASSETS = [
+    "btn-add.png",
+    "btn-exit.png",
+    "btn-grow.png",
+    "drag.png",
+    "helmet.png",
+    "Helvetica-Bold.ttf",
+]
+
+
+def resource_path(name):
+    bundled = path.join(BASE_DIR, "resources", name)
+    if EXECUTABLE_DIR == BASE_DIR or path.exists(bundled):
+        return bundled
+    return path.join(EXECUTABLE_DIR, "resources", name)
+
+
+def write_pack(names, pack_path):
+    """
+    Pack format: magic, u32 index length, JSON index of
+    {name: [offset, length]}, then the file contents back to back.
+    """
+    blobs = []
+    index = {}
+    offset = 0
+    for name in names:
+        with open(resource_path(name), "rb") as f:
+            data = f.read()
+        index[name] = [offset, len(data)]
+        blobs.append(data)
+        offset += len(data)
+    header = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    with open(pack_path, "wb") as f:
+        f.write(PACK_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for data in blobs:
+            f.write(data)
+
+
+def read_pack(pack_path):
+    """
+    Return {name: bytes} for a pack file, or {} if it is missing or invalid.
+    """
+    try:
+        with open(pack_path, "rb") as f:
+            contents = f.read()
+    except OSError:
+        return {}
+    start = len(PACK_MAGIC) + 4
+    if not contents.startswith(PACK_MAGIC) or len(contents) < start:
+        return {}
+    (header_length,) = struct.unpack_from("<I", contents, len(PACK_MAGIC))
+    try:
+        index = json.loads(contents[start : start + header_length])
+    except ValueError:
+        return {}
+    body = start + header_length
+    return {
+        name: contents[body + offset : body + offset + length]
+        for name, (offset, length) in index.items()
+    }
+
+
+class AssetRegistry:
+    def __init__(self):
+        self.pack = None
+        self.pixmaps = {}
+        self.icons = {}
+
+    def data(self, name):
+        """
+        Raw bytes of a packed asset, or None if it is not in the pack.
+        """
+        if self.pack is None:
+            self.pack = read_pack(resource_path(PACK_NAME))
+        return self.pack.get(name)
+
+    def pixmap(self, name):
+        pixmap = self.pixmaps.get(name)
+        if pixmap is None:
+            pixmap = QPixmap()
+            data = self.data(name)
+            if data is not None:
+                pixmap.loadFromData(data)
+            else:
+                pixmap.load(resource_path(name))
+            self.pixmaps[name] = pixmap
+        return pixmap
+
+    def icon(self, name):
+        icon = self.icons.get(name)
+        if icon is None:
+            pixmap = self.pixmap(name)
+            icon = QIcon(pixmap) if not pixmap.isNull() else QIcon()
+            self.icons[name] = icon
+        return icon
+
+    def load_font(self, name):
+        """
+        Register an application font. Returns the font id, or -1.
+        """
+        data = self.data(name)
+        if data is not None:
+            return QFontDatabase.addApplicationFontFromData(data)
+        return QFontDatabase.addApplicationFont(resource_path(name))
+
+
+assets = AssetRegistry()
+
+
+if __name__ == "__main__":
+    write_pack(PACKED_ASSETS, resource_path(PACK_NAME))
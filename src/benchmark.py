@@ -0,0 +1,611 @@
+"""
+Headless benchmarks for Fasemo.
+
+Runs under Qt's offscreen platform against the local fixture server
+(testserver.py) and writes the results as JSON. With --compare, the run is
+checked against an earlier results file and any metric that got slower (or
+bigger) by more than the threshold is reported as a regression; the exit
+status is then 1.
+
+    python3 benchmark.py --output before.json
+    python3 benchmark.py --output after.json --compare before.json
+
+Suites:
+    panes    open, load, grow, reorder, drag-reinsert and close panes with
+             1, 10, 50 and 200 panes, plus peak RSS
+    history  import synthetic browsing history of 10k, 100k and 1M entries,
+             then time URL-bar completions (prefix and full-text, mean and
+             p95) and batched visit recording
+    filters  compile a filter list, load it from the compiled cache and
+             match 300k requests against it; synthetic rules and URLs
+             unless --filter-list and --filter-urls (one "url [first-party
+             host [type]]" per line) are given
+    find     index the text of 10, 100 and 500 synthetic pages of 3000
+             words each, then time find-in-panes queries (single words,
+             prefixes and several words, mean and p95)
+    render   --render throughput (pages per second) saving 20 fixture
+             pages as PDF and PNG with pools of 1, 2 and 4 views
+    preload  commit-to-paint and commit-to-load latency of URL-bar
+             navigations to pages the fixture server answers after 100 and
+             400 ms, with URL-bar preloading off and on
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from functools import partial
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QEventLoop, QPoint, Qt, QT_VERSION_STR
+from PyQt6.QtWidgets import QApplication
+from settings import settings
+from testserver import FixtureServer
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+DEFAULT_SIZES = [1, 10, 50, 200]
+DEFAULT_HISTORY_SIZES = [10000, 100000, 1000000]
+DEFAULT_FILTER_SIZES = [300000]
+DEFAULT_PRELOAD_DELAYS = [100, 400]
+DEFAULT_FIND_SIZES = [10, 100, 500]
+DEFAULT_RENDER_POOLS = [1, 2, 4]
+FILTER_TYPES = ["script", "image", "stylesheet", "xmlhttprequest", "subdocument", "other"]
+HISTORY_WORDS = [
+    "news", "mail", "docs", "python", "video", "shop", "wiki", "forum",
+    "blog", "api", "search", "photo", "music", "maps", "code", "cloud",
+    "game", "sport", "travel", "weather",
+]
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process in KB, or None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KB elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def flush(app):
+    app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents)
+
+
+def wait_until(app, predicate, timeout_s):
+    deadline = time.monotonic() + timeout_s
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 50)
+    return True
+
+
+class Timer:
+    def __init__(self, results, key, ops):
+        self.results = results
+        self.key = key
+        self.ops = ops
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        total_ms = (time.perf_counter() - self.start) * 1000
+        self.results[self.key] = {
+            "total_ms": round(total_ms, 3),
+            "per_op_ms": round(total_ms / max(self.ops, 1), 4),
+            "ops": self.ops,
+        }
+
+
+# -------- Suites --------
+def run_pane_suite(app, base_url, sizes, seed):
+    from fasemo import Fasemo
+    from memory import renderer_report
+
+    results = {}
+    rng = random.Random(seed)
+    for n in sizes:
+        window = Fasemo(initial_urls=[])
+        window.show()
+        wait_until(app, lambda: window.initial_panes_opened, 10)
+        flush(app)
+
+        with Timer(results, f"panes/open/{n}", n):
+            for i in range(n):
+                window.add_browser(f"{base_url}/page/{i}")
+            flush(app)
+
+        def visible_loaded():
+            counts = window.pane_state_counts()
+            views = n - counts["placeholder"]
+            return len(window.metrics.recent) >= views
+
+        with Timer(results, f"panes/load_visible/{n}", 1):
+            wait_until(app, visible_loaded, 30)
+
+        renderers = renderer_report(window.browser_containers)
+        results[f"panes/renderer_rss_kb/{n}"] = {"value": renderers["total_rss"] // 1024}
+
+        panes = window.browser_containers
+        grow_ops = min(n, 20)
+        with Timer(results, f"panes/grow/{n}", grow_ops):
+            for bc in rng.sample(panes, grow_ops):
+                bc.request_grow()
+                flush(app)
+
+        move_ops = min(n, 50)
+        with Timer(results, f"panes/reorder/{n}", move_ops):
+            for _ in range(move_ops):
+                bc = rng.choice(panes)
+                window.h_layout.move_pane(bc, rng.randrange(n))
+                window.move_browser_button(bc)
+                flush(app)
+
+        with Timer(results, f"panes/drag_reinsert/{n}", move_ops):
+            for _ in range(move_ops):
+                bc = rng.choice(panes)
+                x = window.h_layout.pane_x(rng.randrange(n)) + 1
+                window.reinsert_browser(bc, QPoint(x, 10))
+                flush(app)
+
+        with Timer(results, f"panes/close/{n}", n):
+            for bc in list(panes):
+                window.close_browser(bc)
+                flush(app)
+
+        results[f"panes/peak_rss_kb/{n}"] = {"value": peak_rss_kb()}
+        window.close()
+        window.deleteLater()
+        flush(app)
+    return results
+
+
+def synthetic_history(rng, n):
+    now = time.time()
+    for i in range(n):
+        host = f"{rng.choice(HISTORY_WORDS)}{rng.randrange(5000)}.{rng.choice(['com', 'org', 'net'])}"
+        www = "www." if i % 3 == 0 else ""
+        url = f"https://{www}{host}/{rng.choice(HISTORY_WORDS)}/{i}"
+        title = " ".join(rng.choice(HISTORY_WORDS) for _ in range(4)).title()
+        # Few pages are visited often
+        visits = min(1 + int(rng.paretovariate(1.5)), 200)
+        yield url, title, visits, now - rng.random() * 365 * 86400
+
+
+def history_queries(rng, count=200):
+    prefix = []
+    fulltext = []
+    for _ in range(count):
+        host = f"{rng.choice(HISTORY_WORDS)}{rng.randrange(5000)}"
+        prefix.append(host[: rng.randint(1, len(host))])
+        word = rng.choice(HISTORY_WORDS)
+        fulltext.append(f"{rng.choice(HISTORY_WORDS)} {word[: rng.randint(1, len(word))]}")
+    return {"prefix": prefix, "fulltext": fulltext}
+
+
+def run_history_suite(app, base_url, sizes, seed):
+    from history import HistoryStore
+    from metrics import percentile
+
+    results = {}
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        for n in sizes:
+            store = HistoryStore(os.path.join(directory, f"history-{n}.sqlite"), 50)
+            with Timer(results, f"history/import/{n}", n):
+                store.import_entries(synthetic_history(rng, n))
+
+            for kind, texts in history_queries(rng).items():
+                times = []
+                with Timer(results, f"history/{kind}/{n}", len(texts)):
+                    for text in texts:
+                        started = time.perf_counter()
+                        store.complete(text)
+                        times.append((time.perf_counter() - started) * 1000)
+                results[f"history/{kind}_p95/{n}"] = {
+                    "value": round(percentile(times, 0.95), 4)
+                }
+
+            writes = 1000
+            with Timer(results, f"history/record/{n}", writes):
+                for i in range(writes):
+                    url = f"https://visited{i}.example/"
+                    store.record_visit(url)
+                    store.record_title(url, f"Visited {i}")
+            with Timer(results, f"history/flush/{n}", writes):
+                store.flush()
+            store.close()
+    return results
+
+
+def synthetic_vocabulary(rng, n=20000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(n)]
+
+
+def synthetic_page(rng, vocabulary, words=3000):
+    # Word frequencies roughly follow Zipf's law, as in real text
+    picks = [vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)] for _ in range(words // 2)]
+    picks += rng.choices(vocabulary, k=words - len(picks))
+    rng.shuffle(picks)
+    return " ".join(picks)
+
+
+def find_queries(rng, vocabulary, count=200):
+    common = vocabulary[:200]
+    word = []
+    prefix = []
+    words = []
+    for _ in range(count):
+        word.append(rng.choice(vocabulary))
+        term = rng.choice(common)
+        prefix.append(term[: rng.randint(1, len(term))])
+        words.append(f"{rng.choice(common)} {rng.choice(vocabulary)} {rng.choice(common)[:3]}")
+    return {"word": word, "prefix": prefix, "words": words}
+
+
+def run_find_suite(app, base_url, sizes, seed):
+    from metrics import percentile
+    from textindex import TextIndex
+
+    results = {}
+    rng = random.Random(seed)
+    vocabulary = synthetic_vocabulary(rng)
+    for n in sizes:
+        index = TextIndex()
+        pages = [synthetic_page(rng, vocabulary) for _ in range(n)]
+        with Timer(results, f"find/index/{n}", n):
+            for i, text in enumerate(pages):
+                index.submit(i, f"https://page{i}.example/", f"Page {i}", text)
+            index.flush()
+        # Replacing a page's text, as after a DOM change
+        with Timer(results, f"find/reindex/{n}", n):
+            for i, text in enumerate(pages):
+                index.submit(i, f"https://page{i}.example/", f"Page {i}", text)
+            index.flush()
+
+        for kind, texts in find_queries(rng, vocabulary).items():
+            times = []
+            with Timer(results, f"find/{kind}/{n}", len(texts)):
+                for text in texts:
+                    started = time.perf_counter()
+                    index.search(text)
+                    times.append((time.perf_counter() - started) * 1000)
+            results[f"find/{kind}_p95/{n}"] = {"value": round(percentile(times, 0.95), 4)}
+        index.close()
+    return results
+
+
+def run_render_suite(app, base_url, sizes, seed, pages=20):
+    from render import BatchRenderer
+
+    results = {}
+    urls = [f"{base_url}/page/{seed}-{i}" for i in range(pages)]
+    for pool_size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            renderer = BatchRenderer(urls, directory, ["pdf", "png"], pool_size, 30000)
+            with Timer(results, f"render/page/{pool_size}", pages):
+                renderer.start()
+                wait_until(app, renderer.done, 120)
+            # per_op_ms above is the inverse of pages per second, which
+            # keeps "bigger is worse" for --compare
+            summary = renderer.summary or {}
+            results[f"render/failures/{pool_size}"] = {
+                "value": pages - summary.get("ok", 0)
+            }
+    return results
+
+
+def synthetic_filter_list(rng, rules=40000):
+    lines = ["[Adblock Plus 2.0]", "! Synthetic list"]
+    for i in range(rules):
+        word = HISTORY_WORDS[i % len(HISTORY_WORDS)]
+        kind = i % 10
+        if kind < 6:
+            lines.append(f"||{word}{i}.adserver.com^")
+        elif kind == 6:
+            lines.append(f"||cdn{i}.{word}.net/track/*.gif$image,third-party")
+        elif kind == 7:
+            lines.append(f"/{word}{i}/banner_")
+        elif kind == 8:
+            lines.append(f"-{word}-ad{i}.")
+        elif i % 1000 == 9:
+            lines.append(f"/^https?://[a-z]+{i}\\.{word}\\.com\\/pixel/$script")
+        else:
+            lines.append(f"@@||{word}{i - 3}.adserver.com/ok^")
+        if i % 50 == 0:
+            lines.append(f"{word}.com##.ad-{i}")
+    return lines
+
+
+def synthetic_requests(rng, n, rules=40000):
+    requests = []
+    for i in range(n):
+        site = f"{rng.choice(HISTORY_WORDS)}{rng.randrange(1000)}.com"
+        roll = rng.random()
+        j = rng.randrange(rules)
+        word = HISTORY_WORDS[j % len(HISTORY_WORDS)]
+        if roll < 0.1:
+            url = f"https://{word}{j}.adserver.com/serve/{i}.js"
+        elif roll < 0.15:
+            url = f"https://{site}/static/{word}{j}/banner_{i}.png"
+        else:
+            url = f"https://cdn.{site}/{word}/{rng.choice(HISTORY_WORDS)}/{i}.{rng.choice(['js', 'css', 'png', 'json'])}?v={rng.randrange(99999)}"
+        requests.append((url, site, rng.choice(FILTER_TYPES)))
+    return requests
+
+
+def read_requests(file_path):
+    requests = []
+    with open(file_path) as f:
+        for line in f:
+            fields = line.split()
+            if fields:
+                first_party = fields[1] if len(fields) > 1 else ""
+                resource_type = fields[2] if len(fields) > 2 else "other"
+                requests.append((fields[0], first_party, resource_type))
+    return requests
+
+
+def run_filter_suite(app, base_url, sizes, seed, lists=None, recorded=None):
+    from filters import compile_lists, load_filters
+
+    results = {}
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        if not lists:
+            lists = [os.path.join(directory, "synthetic.txt")]
+            with open(lists[0], "w") as f:
+                f.write("\n".join(synthetic_filter_list(rng)) + "\n")
+        recorded_requests = read_requests(recorded) if recorded else None
+        lines = sum(1 for list_path in lists for _ in open(list_path, encoding="utf-8", errors="replace"))
+
+        with Timer(results, "filters/compile", lines):
+            engine = compile_lists(lists)
+        cache_dir = os.path.join(directory, "cache")
+        load_filters(lists, cache_dir)
+        with Timer(results, "filters/load_cached", 1):
+            engine = load_filters(lists, cache_dir)
+
+        for n in sizes:
+            if recorded_requests:
+                requests = (recorded_requests * (n // len(recorded_requests) + 1))[:n]
+            else:
+                requests = synthetic_requests(rng, n)
+            match = engine.match
+            # The first pass also compiles the regexes of the rules it hits
+            with Timer(results, f"filters/match_cold/{n}", n):
+                for url, first_party, resource_type in requests:
+                    match(url, first_party, resource_type)
+            with Timer(results, f"filters/match/{n}", n):
+                for url, first_party, resource_type in requests:
+                    match(url, first_party, resource_type)
+    return results
+
+
+def wait_ms(app, ms):
+    wait_until(app, lambda: False, ms / 1000)
+
+
+def run_preload_suite(app, base_url, sizes, seed, navigations=5, think_ms=1500):
+    from fasemo import Fasemo
+
+    results = {}
+    for enabled in (False, True):
+        settings.override("preload/enabled", enabled)
+        label = "on" if enabled else "off"
+        window = Fasemo(initial_urls=[])
+        window.show()
+        wait_until(app, lambda: window.initial_panes_opened, 10)
+        bc = window.add_browser(f"{base_url}/page/0")
+        bc.activate()
+        wait_until(app, lambda: len(window.metrics.recent) >= 1, 30)
+
+        for delay in sizes:
+            load_times = []
+            paint_times = []
+            for i in range(navigations):
+                url = f"{base_url}/slow/{delay}?run={seed}-{label}-{i}"
+                # Type the URL, pause like a user would, then press Enter
+                bc.url_edit.setText(url)
+                bc.url_edit.textEdited.emit(url)
+                wait_ms(app, think_ms)
+                bc.on_url_edited()
+                record = window.metrics.recent_commits[-1]
+                wait_until(app, lambda: record["commit_to_load_ms"] is not None, 30)
+                wait_until(app, lambda: record["commit_to_paint_ms"] is not None, 2)
+                load_times.append(record["commit_to_load_ms"])
+                if record["commit_to_paint_ms"] is not None:
+                    paint_times.append(record["commit_to_paint_ms"])
+                flush(app)
+
+            results[f"preload/{label}/commit_to_load/{delay}"] = {
+                "value": statistics.median(t for t in load_times if t is not None)
+                if any(t is not None for t in load_times)
+                else None
+            }
+            # The offscreen platform may not paint web content at all
+            results[f"preload/{label}/commit_to_paint/{delay}"] = {
+                "value": statistics.median(paint_times) if paint_times else None
+            }
+        if window.preloader is not None:
+            # Counted as misses, so that bigger is worse for --compare
+            results[f"preload/{label}/prerender_misses"] = {
+                "value": len(sizes) * navigations - window.preloader.stats["hits"]
+            }
+        window.close()
+        window.deleteLater()
+        flush(app)
+    return results
+
+
+SUITES = {
+    "panes": run_pane_suite,
+    "history": run_history_suite,
+    "filters": run_filter_suite,
+    "preload": run_preload_suite,
+    "find": run_find_suite,
+    "render": run_render_suite,
+}
+
+
+# -------- Results --------
+def metric_value(entry):
+    return entry.get("per_op_ms", entry.get("value"))
+
+
+def merge_runs(runs):
+    """
+    Take the median of each metric over repeated runs.
+    """
+    merged = {}
+    for key in runs[0]:
+        entries = [run[key] for run in runs if key in run]
+        merged[key] = dict(entries[0])
+        for field in ("total_ms", "per_op_ms", "value"):
+            values = [e[field] for e in entries if e.get(field) is not None]
+            if values:
+                merged[key][field] = statistics.median(values)
+    return merged
+
+
+def compare(results, baseline, threshold):
+    """
+    Return a list of (key, before, after) for metrics that regressed.
+    Every metric is "bigger is worse"; a count that was 0 regresses as
+    soon as it is not.
+    """
+    regressions = []
+    for key, entry in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        old, new = metric_value(before), metric_value(entry)
+        if old is None or new is None or old < 0:
+            continue
+        if new > old * (1 + threshold) and new > old:
+            regressions.append((key, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="benchmark")
+    parser.add_argument("--suite", choices=list(SUITES), action="append")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help="comma-separated pane counts (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--history-sizes",
+        default=",".join(map(str, DEFAULT_HISTORY_SIZES)),
+        help="comma-separated history entry counts (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--filter-sizes",
+        default=",".join(map(str, DEFAULT_FILTER_SIZES)),
+        help="comma-separated request counts for the filters suite (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--filter-list",
+        action="append",
+        metavar="FILE",
+        help="filter list for the filters suite instead of a synthetic one",
+    )
+    parser.add_argument(
+        "--filter-urls",
+        metavar="FILE",
+        help="recorded requests for the filters suite, one 'url [first-party host [type]]' per line",
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", metavar="BASELINE")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="relative slowdown that counts as a regression (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    history_sizes = [int(size) for size in args.history_sizes.split(",") if size]
+    filter_sizes = [int(size) for size in args.filter_sizes.split(",") if size]
+    suites = dict(
+        SUITES,
+        filters=partial(run_filter_suite, lists=args.filter_list, recorded=args.filter_urls),
+    )
+
+    settings.override("session/enabled", False)
+    settings.override("memory/budget_mb", 0)
+    # Keep benchmark visits out of the user's history
+    settings.override("history/enabled", False)
+
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    app = QApplication(sys.argv[:1])
+    app.setOrganizationName("Cinemint")
+    app.setApplicationName("Fasemo")
+
+    server = FixtureServer()
+    base_url = server.start()
+    try:
+        results = {}
+        for name in args.suite or list(SUITES):
+            suite_sizes = {
+                "history": history_sizes,
+                "filters": filter_sizes,
+                "preload": DEFAULT_PRELOAD_DELAYS,
+                "find": DEFAULT_FIND_SIZES,
+                "render": DEFAULT_RENDER_POOLS,
+            }.get(name, sizes)
+            runs = [
+                suites[name](app, base_url, suite_sizes, args.seed + i)
+                for i in range(args.repeat)
+            ]
+            results.update(merge_runs(runs))
+    finally:
+        server.stop()
+
+    document = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "qt": QT_VERSION_STR,
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "history_sizes": history_sizes,
+            "filter_sizes": filter_sizes,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(document, f, indent=2)
+
+    for key, entry in results.items():
+        print(f"{key:40} {metric_value(entry)}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for key, old, new in regressions:
+            print(f"REGRESSION {key}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -62,4 +62,113 @@ QScrollBar::add-line, QScrollBar::sub-line {
 QScrollBar::add-page, QScrollBar::sub-page {
     background: black;
 }
-"""
\ No newline at end of file
+"""
+# Default values for user-configurable settings. Each key can be changed
+# through QSettings (see settings.py) or overridden on the command line.
+const_default_settings = {
+    # Total renderer memory allowed before idle panes are discarded, in MB.
+    # A value of 0 disables discarding.
+    "memory/budget_mb": 3072,
+    # How often renderer memory is sampled, in milliseconds
+    "memory/sample_interval_ms": 5000,
+    # Freeze panes that are further than freeze_margin_px outside the viewport
+    "lifecycle/freeze_offscreen": True,
+    "lifecycle/freeze_margin_px": 400,
+    # Print frozen/active pane counts to stderr when they change
+    "lifecycle/report_pane_states": False,
+    # Favicon cache: directory ("" = the platform cache location),
+    # in-memory entry count and on-disk size limit
+    "favicons/cache_dir": "",
+    "favicons/memory_entries": 256,
+    "favicons/disk_limit_kb": 2048,
+    # Wallpaper image ("" = the bundled one), number of scaled sizes kept,
+    # and how long a resize has to settle before the smooth rescale
+    "wallpaper/path": "",
+    "wallpaper/cache_entries": 4,
+    "wallpaper/debounce_ms": 120,
+    # Session file ("" = session.json in the app data location), whether it
+    # is used, how often it is saved, and whether back/forward history is kept
+    "session/path": "",
+    "session/enabled": True,
+    "session/autosave_ms": 60000,
+    "session/save_history": False,
+    # Shared web profile. Empty paths use QtWebEngine's defaults under the
+    # app data and cache locations. cache_mode is "disk", "memory" or "none";
+    # a cache size of 0 lets Chromium choose.
+    "profile/name": "default",
+    "profile/storage_path": "",
+    "profile/cache_path": "",
+    "profile/cache_mode": "disk",
+    "profile/cache_size_mb": 512,
+    "profile/persistent_cookies": True,
+    # File for the cache hit/size report ("" = no report, "-" = stdout)
+    "profile/cache_report": "",
+    # Chromium process model: "default", "process-per-site",
+    # "site-per-process" or "single-process", and the renderer process
+    # limit (0 = no limit). Applied at startup.
+    "engine/process_model": "default",
+    "engine/renderer_process_limit": 0,
+    # File for the per-pane renderer report ("" = no report, "-" = stdout)
+    "engine/renderer_report": "",
+    # JSON-lines file for navigation metrics ("" = in-process only)
+    "metrics/log_path": "",
+    # Print timing stats of each pane drag to stderr
+    "diagnostics/drag_stats": False,
+    # How a pane follows its resize handle: live, deferred or throttled
+    "resize/mode": "deferred",
+    # Relayouts per second in throttled resize mode
+    "resize/max_fps": 15,
+    # Browsing history; an empty path keeps it in the app data directory
+    "history/enabled": True,
+    "history/path": "",
+    # Visits are written to disk in batches at most this often
+    "history/batch_ms": 1000,
+    # Number of completions shown under the URL bar
+    "history/completions": 8,
+    # Content filter lists (EasyList format), separated by os.pathsep, and
+    # where their compiled form is cached ("" = the platform cache location)
+    "filters/lists": "",
+    "filters/cache_dir": "",
+    # Warm the likely target of a URL bar after a typing pause: preconnect,
+    # or prerender when the history makes the target near certain
+    "preload/enabled": False,
+    "preload/delay_ms": 300,
+    "preload/prerender": True,
+    "preload/min_visits": 3,
+    # A prerendered page nobody committed to is dropped after this long
+    "preload/ttl_ms": 30000,
+    # Panes loading at the same time (0 = no limit), and how long a load
+    # may hold its slot
+    "loads/max_concurrent": 4,
+    "loads/timeout_ms": 30000,
+    # Print every scheduled pane load to stderr
+    "diagnostics/load_stats": False,
+    # Width of the pane thumbnails in the overview, and the memory their
+    # compressed images may take
+    "thumbnails/width": 320,
+    "thumbnails/memory_kb": 16384,
+    # Index the visible text of every pane for the find-in-panes box, and
+    # how many matching panes it lists
+    "find/enabled": True,
+    "find/results": 10,
+    # UI thread diagnostics: report event loop stalls longer than stall_ms
+    # with the UI thread's stack, and the layout work of each user action.
+    # profile starts a profile at launch; profiles are written to
+    # profile_dir ("" = the temporary directory)
+    "diagnostics/watchdog": False,
+    "diagnostics/stall_ms": 200,
+    "diagnostics/layout_counts": False,
+    "diagnostics/profile": False,
+    "diagnostics/profile_dir": "",
+    # Headless batch rendering (--render): formats saved for each page
+    # ("pdf", "png" or both, comma-separated), pages loading at once, time
+    # allowed per page and the width pages are laid out at
+    "render/formats": "pdf,png",
+    "render/pool_size": 4,
+    "render/timeout_ms": 30000,
+    "render/width": 1280,
+    # Hand the URLs of a later launch to the running instance, waiting at
+    # most this long for it to answer
+    "instance/single": True,
+    "instance/timeout_ms": 3000,
+}
@@ -1 +1,2 @@
-pyinstaller --clean --onefile --noconsole --icon=app_icon.ico fasemo.py
\ No newline at end of file
+python3 assets.py
+pyinstaller --clean --onefile --noconsole --icon=app_icon.ico --add-data "resources/ui.pack:resources" fasemo.py
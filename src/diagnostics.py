@@ -0,0 +1,246 @@
+"""
+UI thread diagnostics for --diagnose and --profile.
+
+StallWatchdog: the UI thread bumps a heartbeat from a timer every
+HEARTBEAT_MS, and a background thread watches it. Once the UI thread has
+not been back to the event loop for diagnostics/stall_ms, the watcher
+captures the UI thread's Python stack. The stall is reported with its full
+length when the event loop runs again:
+
+    {"event": "stall", "duration_ms": 412.7, "stack": ["  File ...", ...]}
+
+A stack that ends in main() means the time went to Qt itself, outside any
+Python code.
+
+ActionCounter: counts the layout work following each user input (layout
+passes, i.e. LayoutRequest events, resize events and strip relayouts) and
+reports it once nothing has been relaid out for ACTION_QUIET_MS. Repeated
+input of one kind on one widget (wheel scrolling, key repeat) is one
+action; a drag counts as its button press:
+
+    {"event": "action", "input": "MouseButtonPress",
+     "target": "SplitterHandle", "layout_requests": 3, "resizes": 41,
+     "strip_passes": 12, "strip_moves": 80, "duration_ms": 35.2}
+
+Profiler: a cProfile session of the UI thread, started and stopped with
+Ctrl+Shift+P (or started at launch with --profile). When it stops, the
+profile is written to a .prof file for pstats or snakeviz and the
+functions with the most cumulative time are printed.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from PyQt6.QtCore import QEvent, QObject, QTimer
+from PyQt6.QtGui import QInputEvent
+from PyQt6.QtWidgets import QWidget
+
+HEARTBEAT_MS = 50
+ACTION_QUIET_MS = 300
+PROFILE_TOP = 25
+
+INPUT_EVENTS = {
+    QEvent.Type.MouseButtonPress,
+    QEvent.Type.MouseButtonRelease,
+    QEvent.Type.MouseButtonDblClick,
+    QEvent.Type.KeyPress,
+    QEvent.Type.Wheel,
+    QEvent.Type.Drop,
+}
+
+
+class StallWatchdog(QObject):
+    def __init__(self, threshold_ms, report, parent=None):
+        """
+        Must be created on the UI thread.
+        """
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.report = report
+        self.ui_thread = threading.get_ident()
+        self.last_beat = time.monotonic()
+        # (heartbeat the stall started after, stack lines), set by the watcher
+        self.captured = None
+        self.stalls = 0
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(HEARTBEAT_MS)
+        self.timer.timeout.connect(self.beat)
+        self.timer.start()
+
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+        self.thread.start()
+
+    def beat(self):
+        now = time.monotonic()
+        previous, self.last_beat = self.last_beat, now
+        stall = now - previous - HEARTBEAT_MS / 1000
+        captured, self.captured = self.captured, None
+        if stall < self.threshold:
+            return
+        self.stalls += 1
+        stack = captured[1] if captured and captured[0] == previous else []
+        self.report(
+            {
+                "event": "stall",
+                "duration_ms": round(stall * 1000, 1),
+                "stack": [line.rstrip("\n") for line in stack],
+            }
+        )
+
+    def watch(self):
+        while not self.stopped.wait(self.threshold / 2):
+            beat = self.last_beat
+            if self.captured is not None:
+                continue
+            if time.monotonic() - beat - HEARTBEAT_MS / 1000 < self.threshold:
+                continue
+            frame = sys._current_frames().get(self.ui_thread)
+            if frame is not None:
+                self.captured = (beat, traceback.format_stack(frame))
+
+    def stop(self):
+        self.timer.stop()
+        self.stopped.set()
+
+
+class ActionCounter(QObject):
+    def __init__(self, strip, report, parent=None):
+        """
+        strip is the StripLayout, whose relayouts are counted as well.
+        Install with QApplication.instance().installEventFilter().
+        """
+        super().__init__(parent)
+        self.strip = strip
+        self.report = report
+        self.action = None
+
+        self.quiet_timer = QTimer(self)
+        self.quiet_timer.setSingleShot(True)
+        self.quiet_timer.setInterval(ACTION_QUIET_MS)
+        self.quiet_timer.timeout.connect(self.finish)
+
+    def eventFilter(self, source, event):
+        kind = event.type()
+        if kind in INPUT_EVENTS and isinstance(source, QWidget):
+            timestamp = event.timestamp() if isinstance(event, QInputEvent) else None
+            action = self.action
+            # The same event propagating to a parent widget has the same
+            # timestamp
+            if (
+                action is None
+                or action["kind"] != kind
+                or (action["source"] is not source and action["timestamp"] != timestamp)
+            ):
+                self.finish()
+                self.begin(kind, source, timestamp)
+            self.quiet_timer.start()
+        elif self.action is not None:
+            if kind == QEvent.Type.LayoutRequest:
+                self.action["layout_requests"] += 1
+                self.touch()
+            elif kind == QEvent.Type.Resize:
+                self.action["resizes"] += 1
+                self.touch()
+        return False
+
+    def begin(self, kind, source, timestamp):
+        self.action = {
+            "kind": kind,
+            "source": source,
+            "timestamp": timestamp,
+            "input": kind.name,
+            "target": type(source).__name__,
+            "layout_requests": 0,
+            "resizes": 0,
+            "strip_passes": self.strip.passes,
+            "strip_moves": self.strip.moves,
+            "started": time.monotonic(),
+            "last": time.monotonic(),
+        }
+
+    def touch(self):
+        self.action["last"] = time.monotonic()
+        self.quiet_timer.start()
+
+    def finish(self):
+        action, self.action = self.action, None
+        if action is None:
+            return
+        self.quiet_timer.stop()
+        passes = self.strip.passes - action["strip_passes"]
+        moves = self.strip.moves - action["strip_moves"]
+        # Input that caused no layout work at all is not worth a line
+        if not (action["layout_requests"] or action["resizes"] or passes):
+            return
+        self.report(
+            {
+                "event": "action",
+                "input": action["input"],
+                "target": action["target"],
+                "layout_requests": action["layout_requests"],
+                "resizes": action["resizes"],
+                "strip_passes": passes,
+                "strip_moves": moves,
+                "duration_ms": round((action["last"] - action["started"]) * 1000, 1),
+            }
+        )
+
+
+class Profiler:
+    def __init__(self, directory, report):
+        self.directory = directory or tempfile.gettempdir()
+        self.report = report
+        self.profile = None
+        self.started = None
+
+    def running(self):
+        return self.profile is not None
+
+    def toggle(self):
+        if self.running():
+            self.stop()
+        else:
+            self.start()
+
+    def start(self):
+        if self.running():
+            return
+        self.profile = cProfile.Profile()
+        self.started = time.monotonic()
+        self.profile.enable()
+
+    def stop(self):
+        """
+        End the session, write it out and report where to.
+        """
+        if not self.running():
+            return None
+        self.profile.disable()
+        profile, self.profile = self.profile, None
+        file_path = os.path.join(
+            self.directory, time.strftime("fasemo-%Y%m%d-%H%M%S.prof")
+        )
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(file_path)
+        except OSError:
+            file_path = None
+
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        self.report(
+            {
+                "event": "profile",
+                "duration_ms": round((time.monotonic() - self.started) * 1000, 1),
+                "path": file_path,
+                "top": text.getvalue(),
+            }
+        )
+        return file_path
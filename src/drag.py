@@ -0,0 +1,95 @@
+"""
+Drag session for reordering panes.
+
+Pane geometry is snapshotted once when a drag enters the window, so hit
+testing during the drag is a bisect over plain Python lists and never asks
+Qt for widget geometry. Drag move events only record the latest position;
+the insertion line is updated at most once per display frame, and only
+moved when the target index actually changes. Timing of every frame
+update is kept for stats().
+"""
+from bisect import bisect_right
+from time import perf_counter
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtWidgets import QApplication
+
+
+class DragSession(QObject):
+    def __init__(self, window, parent=None):
+        super().__init__(parent)
+        self.window = window
+        strip = window.h_layout
+
+        # Snapshot of the strip: left edge of each pane and the x that
+        # splits "insert before" from "insert after" for it
+        self.starts = []
+        self.midpoints = []
+        x = strip.pane_x(0)
+        for pane, slot in strip.panes.slots():
+            self.starts.append(x)
+            self.midpoints.append(x + strip.pane_width(pane) / 2)
+            x += slot
+        self.end_x = x - strip.gap()
+
+        self.pending_x = None
+        self.target_index = None
+        self.started = perf_counter()
+        self.move_events = 0
+        self.frames = 0
+        self.line_moves = 0
+        self.frame_times = []
+
+        refresh_rate = QApplication.primaryScreen().refreshRate() or 60
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(max(1, int(1000 / refresh_rate)))
+        self.timer.timeout.connect(self.update_frame)
+
+    def insert_index_at(self, x):
+        return bisect_right(self.midpoints, x)
+
+    def line_x(self, index):
+        if index < len(self.starts):
+            return self.starts[index] - 17
+        if self.starts:
+            # Just inside the right edge of the last handle
+            return self.end_x - 5
+        return 0
+
+    def move(self, pos):
+        """
+        Record a drag move. The indicator catches up on the next frame.
+        """
+        self.move_events += 1
+        self.pending_x = pos.x()
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def update_frame(self):
+        if self.pending_x is None:
+            return
+        started = perf_counter()
+        index = self.insert_index_at(self.pending_x)
+        self.pending_x = None
+        if index != self.target_index:
+            self.target_index = index
+            self.window.place_insertion_line(self.line_x(index))
+            self.line_moves += 1
+        self.frames += 1
+        self.frame_times.append((perf_counter() - started) * 1000)
+
+    def finish(self):
+        self.timer.stop()
+        return self.stats()
+
+    def stats(self):
+        times = self.frame_times
+        return {
+            "duration_ms": round((perf_counter() - self.started) * 1000, 1),
+            "panes": len(self.starts),
+            "move_events": self.move_events,
+            "frames": self.frames,
+            "line_moves": self.line_moves,
+            "frame_ms_mean": round(sum(times) / len(times), 4) if times else None,
+            "frame_ms_max": round(max(times), 4) if times else None,
+        }
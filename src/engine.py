@@ -0,0 +1,317 @@
+"""
+The QWebEngineProfile shared by every pane, the request interceptor that
+applies the content filters, page text extraction for the cross-pane
+search, and the HTTP cache report.
+
+This module imports QtWebEngine, so it is only imported once the first
+pane's view is created (see BrowserContainer.ensure_browser).
+"""
+import json
+import os
+from collections import Counter
+from PyQt6.QtWebEngineCore import (
+    QWebEnginePage,
+    QWebEngineProfile,
+    QWebEngineScript,
+    QWebEngineUrlRequestInfo,
+    QWebEngineUrlRequestInterceptor,
+)
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from PyQt6.QtWidgets import QApplication
+from settings import settings
+from filters import load_filters
+
+CACHE_TYPES = {
+    "disk": QWebEngineProfile.HttpCacheType.DiskHttpCache,
+    "memory": QWebEngineProfile.HttpCacheType.MemoryHttpCache,
+    "none": QWebEngineProfile.HttpCacheType.NoCache,
+}
+
+# Counts page and subresource loads from the Resource Timing API. A zero
+# transferSize with a non-empty body means the HTTP cache served it; a
+# transfer smaller than the body means a 304 revalidation.
+CACHE_STATS_SCRIPT = """
+(function() {
+    var entries = performance.getEntriesByType("navigation")
+        .concat(performance.getEntriesByType("resource"));
+    var stats = {requests: 0, cached: 0, revalidated: 0, opaque: 0,
+                 transferred: 0, decoded: 0};
+    entries.forEach(function(e) {
+        stats.requests += 1;
+        if (e.transferSize === 0 && e.decodedBodySize === 0) {
+            stats.opaque += 1;
+        } else if (e.transferSize === 0) {
+            stats.cached += 1;
+        } else if (e.transferSize < e.encodedBodySize) {
+            stats.revalidated += 1;
+        }
+        stats.transferred += e.transferSize || 0;
+        stats.decoded += e.decodedBodySize || 0;
+    });
+    return stats;
+})()
+"""
+
+# Runs in an isolated world of every page when the cross-pane search is on.
+# Once mutations have added or changed TEXT_CHANGE_CHARS characters of text,
+# it waits for TEXT_SETTLE_MS and then tells the page (through a console
+# message) that its text is worth extracting again.
+TEXT_CHANGED_MESSAGE = "fasemo:text-changed"
+TEXT_CHANGE_CHARS = 2000
+TEXT_SETTLE_MS = 2000
+TEXT_OBSERVER_SCRIPT = """
+(function() {
+    var changed = 0, timer = null;
+    new MutationObserver(function(records) {
+        records.forEach(function(record) {
+            if (record.type === "characterData") {
+                changed += record.target.data.length;
+            } else {
+                record.addedNodes.forEach(function(node) {
+                    changed += (node.textContent || "").length;
+                });
+            }
+        });
+        if (changed >= %d && timer === null) {
+            timer = setTimeout(function() {
+                timer = null;
+                changed = 0;
+                console.debug("%s");
+            }, %d);
+        }
+    }).observe(document.documentElement,
+               {childList: true, subtree: true, characterData: true});
+})();
+""" % (TEXT_CHANGE_CHARS, TEXT_CHANGED_MESSAGE, TEXT_SETTLE_MS)
+
+# Isolated world for the scripts above, as the plain number the APIs take
+APPLICATION_WORLD = QWebEngineScript.ScriptWorldId.ApplicationWorld.value
+
+TEXT_SCRIPT = """
+({title: document.title,
+  text: document.body ? document.body.innerText.slice(0, %d) : ""})
+"""
+
+ResourceType = QWebEngineUrlRequestInfo.ResourceType
+# Filter list request types for Chromium's resource types; anything else
+# is "other"
+RESOURCE_TYPES = {
+    ResourceType.ResourceTypeMainFrame: "document",
+    ResourceType.ResourceTypeSubFrame: "subdocument",
+    ResourceType.ResourceTypeStylesheet: "stylesheet",
+    ResourceType.ResourceTypeScript: "script",
+    ResourceType.ResourceTypeImage: "image",
+    ResourceType.ResourceTypeFavicon: "image",
+    ResourceType.ResourceTypeFontResource: "font",
+    ResourceType.ResourceTypeMedia: "media",
+    ResourceType.ResourceTypeObject: "object",
+    ResourceType.ResourceTypePluginResource: "object",
+    ResourceType.ResourceTypeXhr: "xmlhttprequest",
+    ResourceType.ResourceTypePing: "ping",
+}
+
+shared = None
+# FilterEngine, or False once it is known that no lists are configured
+filter_engine = None
+
+
+def shared_profile():
+    """
+    Return the application-wide profile, creating it on first use.
+    """
+    global shared
+    if shared is None:
+        shared = create_profile()
+    return shared
+
+
+def create_profile():
+    profile = QWebEngineProfile(
+        settings.value("profile/name"), QApplication.instance()
+    )
+    if settings.value("profile/storage_path"):
+        profile.setPersistentStoragePath(settings.value("profile/storage_path"))
+    if settings.value("profile/cache_path"):
+        profile.setCachePath(settings.value("profile/cache_path"))
+
+    cache_mode = settings.value("profile/cache_mode")
+    profile.setHttpCacheType(
+        CACHE_TYPES.get(cache_mode, QWebEngineProfile.HttpCacheType.DiskHttpCache)
+    )
+    # 0 lets Chromium pick the size
+    profile.setHttpCacheMaximumSize(settings.value("profile/cache_size_mb") * 1024 * 1024)
+
+    if settings.value("profile/persistent_cookies"):
+        profile.setPersistentCookiesPolicy(
+            QWebEngineProfile.PersistentCookiesPolicy.ForcePersistentCookies
+        )
+    else:
+        profile.setPersistentCookiesPolicy(
+            QWebEngineProfile.PersistentCookiesPolicy.NoPersistentCookies
+        )
+
+    if settings.value("find/enabled"):
+        script = QWebEngineScript()
+        script.setName("fasemo-text-observer")
+        script.setSourceCode(TEXT_OBSERVER_SCRIPT)
+        script.setInjectionPoint(QWebEngineScript.InjectionPoint.DocumentReady)
+        script.setWorldId(APPLICATION_WORLD)
+        script.setRunsOnSubFrames(False)
+        profile.scripts().insert(script)
+    return profile
+
+
+def content_filters():
+    """
+    Return the FilterEngine for the configured lists, or None.
+    """
+    global filter_engine
+    if filter_engine is None:
+        lists = [p for p in settings.value("filters/lists").split(os.pathsep) if p]
+        filter_engine = load_filters(lists, settings.value("filters/cache_dir")) or False
+    return filter_engine or None
+
+
+class PaneInterceptor(QWebEngineUrlRequestInterceptor):
+    """
+    Blocks the requests of one page that the content filters match, and
+    counts them. Installed per page rather than on the shared profile so
+    that every request is attributed to its pane; all pages share one
+    FilterEngine.
+    """
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.blocked = 0
+        self.allowed = 0
+        self.blocked_hosts = Counter()
+
+    def interceptRequest(self, info):
+        resource_type = RESOURCE_TYPES.get(info.resourceType(), "other")
+        # Navigations the user asked for are never blocked
+        if resource_type == "document":
+            self.allowed += 1
+            return
+        url = info.requestUrl()
+        if self.engine.match(
+            url.toString(), info.firstPartyUrl().host(), resource_type
+        ):
+            info.block(True)
+            self.blocked += 1
+            self.blocked_hosts[url.host()] += 1
+        else:
+            self.allowed += 1
+
+
+class PanePage(QWebEnginePage):
+    def __init__(self, profile, parent=None):
+        super().__init__(profile, parent)
+        # Called when the page's text changed enough to be extracted again
+        self.text_changed = None
+
+    def javaScriptConsoleMessage(self, level, message, line, source):
+        if message == TEXT_CHANGED_MESSAGE:
+            if self.text_changed:
+                self.text_changed()
+            return
+        super().javaScriptConsoleMessage(level, message, line, source)
+
+
+def extract_text(page, callback, max_chars):
+    """
+    Call callback with the title and visible text of page, as a dict.
+    The script runs in an isolated world, out of reach of the page's own.
+    """
+    page.runJavaScript(
+        TEXT_SCRIPT % max_chars,
+        APPLICATION_WORLD,
+        callback,
+    )
+
+
+def create_page(parent=None):
+    """
+    Create a QWebEnginePage of the shared profile. If content filters are
+    configured, page.blocker is its PaneInterceptor, otherwise None.
+    """
+    page = PanePage(shared_profile(), parent)
+    page.blocker = None
+    engine = content_filters()
+    if engine is not None:
+        page.blocker = PaneInterceptor(engine, page)
+        page.setUrlRequestInterceptor(page.blocker)
+    return page
+
+
+def create_view(page=None):
+    """
+    Create a QWebEngineView showing page, or a new page of the shared
+    profile.
+    """
+    view = QWebEngineView()
+    if page is None:
+        page = create_page(view)
+    else:
+        page.setParent(view)
+    view.setPage(page)
+    return view
+
+
+def directory_size(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class CacheReport:
+    def __init__(self):
+        self.pages = 0
+        self.totals = {
+            "requests": 0,
+            "cached": 0,
+            "revalidated": 0,
+            "opaque": 0,
+            "transferred": 0,
+            "decoded": 0,
+        }
+
+    def collect(self, page):
+        """
+        Add the cache statistics of a page that has finished loading.
+        """
+        page.runJavaScript(CACHE_STATS_SCRIPT, 0, self.add)
+
+    def add(self, stats):
+        if not isinstance(stats, dict):
+            return
+        self.pages += 1
+        for key in self.totals:
+            self.totals[key] += int(stats.get(key, 0))
+
+    def report(self):
+        profile = shared_profile()
+        cache_path = profile.cachePath()
+        measured = self.totals["requests"] - self.totals["opaque"]
+        return {
+            "pages": self.pages,
+            **self.totals,
+            "hit_ratio": round(self.totals["cached"] / measured, 4) if measured else None,
+            "cache_mode": settings.value("profile/cache_mode"),
+            "cache_path": cache_path,
+            "cache_bytes": directory_size(cache_path) if cache_path else 0,
+            "cache_cap_bytes": profile.httpCacheMaximumSize(),
+        }
+
+    def write(self, file_path):
+        line = json.dumps(self.report())
+        if file_path == "-":
+            print(line)
+        else:
+            with open(file_path, "a") as f:
+                f.write(line + "\n")
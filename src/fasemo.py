@@ -1,4 +1,14 @@
 import sys
+from time import perf_counter
+
+# Taken before the Qt imports so --measure-startup can account for them
+STARTED_AT = perf_counter()
+
+import argparse
+import base64
+import json
+import os
+from time import monotonic
 from PyQt6 import sip
 from PyQt6.QtWidgets import (
     QApplication,
@@ -14,12 +24,51 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QLabel,
     QFrame,
+    QFileDialog,
+    QRubberBand,
+    QCompleter,
+)
+from PyQt6.QtCore import (
+    Qt,
+    QUrl,
+    QSize,
+    QMimeData,
+    QPoint,
+    QEvent,
+    QTimer,
+    QByteArray,
+    QDataStream,
+    QIODevice,
+)
+from PyQt6.QtGui import (
+    QPixmap,
+    QPainter,
+    QDrag,
+    QFontDatabase,
+    QFont,
+    QAction,
+    QKeySequence,
+    QStandardItem,
+    QStandardItemModel,
 )
-from PyQt6.QtCore import Qt, QUrl, QSize, QMimeData, QPoint, QEvent
-from PyQt6.QtGui import QPixmap, QPainter, QIcon, QDrag, QFontDatabase, QFont
-from PyQt6.QtWebEngineWidgets import QWebEngineView
-from os import path
 from constants import *
+from settings import settings
+from memory import MemoryMonitor, write_renderer_report
+from metrics import MetricsRecorder
+from drag import DragSession
+from strip import MIN_PANE_WIDTH, StripLayout
+from favicons import FaviconCache
+from wallpaper import WallpaperPipeline
+from assets import assets, resource_path
+from startup import startup
+from session import SessionStore, number
+from history import HistoryStore
+from preload import Preloader
+from loads import LoadScheduler
+from instance import InstanceServer, forward
+from thumbnails import ThumbnailCache, Overview
+from textindex import TextIndex, FindBox, MAX_TEXT
+from diagnostics import StallWatchdog, ActionCounter, Profiler
 
 styles = stylesheet = const_styles
 
@@ -50,15 +99,38 @@ class DragLabel(QLabel):
             drag.exec(Qt.DropAction.MoveAction)
 
 
+class PlaceholderLabel(QLabel):
+    """
+    Shows a pane's URL, elided to the label's width, so that a long URL
+    doesn't make the pane any wider than a live view would be.
+    """
+
+    def __init__(self, url, parent=None):
+        super().__init__(parent)
+        self.url = url
+        self.setToolTip(url)
+        self.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.setMinimumWidth(320)
+        self.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Expanding)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.setText(
+            self.fontMetrics().elidedText(
+                self.url, Qt.TextElideMode.ElideMiddle, max(self.width() - 16, 0)
+            )
+        )
+
+
 class BrowserContainer(QWidget):
     def __init__(self, url: str, parent=None):
         super().__init__(parent)
-        self.browser = QWebEngineView()
-        self.browser.setUrl(QUrl(url))
-        self.browser.setMinimumWidth(320)
-        self.browser.setSizePolicy(
-            QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
-        )
+        self.url = url
+
+        # The QWebEngineView is only created once the pane is looked at
+        # (see ensure_browser); until then a cheap placeholder holds its place.
+        self.browser = None
+        self.placeholder = PlaceholderLabel(url)
 
         layout = QVBoxLayout()
         layout.setContentsMargins(0, 0, 0, 0)
@@ -68,7 +140,7 @@ class BrowserContainer(QWidget):
         top_bar = QHBoxLayout()
 
         self.drag_label = DragLabel()
-        self.drag_label.setPixmap(QPixmap(path.join("resources", "drag.png")))
+        self.drag_label.setPixmap(assets.pixmap("drag.png"))
         self.drag_label.browser_container = self  # Reference back to this container
         top_bar.addWidget(self.drag_label)
 
@@ -77,33 +149,201 @@ class BrowserContainer(QWidget):
             QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed
         )
         self.url_edit.editingFinished.connect(self.on_url_edited)
+        self.url_edit.textEdited.connect(self.update_completions)
+        self.url_edit.textEdited.connect(self.predict_target)
         top_bar.addWidget(self.url_edit)
 
         grow_button = QPushButton()
-        grow_icon = QIcon(path.join("resources", "btn-grow.png"))
-        grow_button.setIcon(grow_icon)
+        grow_button.setIcon(assets.icon("btn-grow.png"))
         grow_button.setText("")
         grow_button.clicked.connect(self.request_grow)
         top_bar.addWidget(grow_button)
 
         close_button = QPushButton()
-        close_icon = QIcon(path.join("resources", "btn-exit.png"))
-        close_button.setIcon(close_icon)
+        close_button.setIcon(assets.icon("btn-exit.png"))
         close_button.setText("")
         close_button.clicked.connect(self.request_close)
         top_bar.addWidget(close_button)
 
         layout.addLayout(top_bar)
-        layout.addWidget(self.browser)
+        layout.addWidget(self.placeholder)
 
-        self.browser.urlChanged.connect(self.on_browser_url_changed)
         self.close_requested = None
+        self.browser_created = None
+        # HistoryStore for URL completions, set by the window
+        self.history = None
+        self.completer = None
+        self.submitted = None
+        # Preloader that warms the likely target while the user types, and
+        # a callback told about every navigation committed in the URL bar
+        self.preloader = None
+        self.navigation_committed = None
+        # Called with the pane and whether the page had finished loading
+        # when a prerendered page is shown; its load signals went out
+        # before the pane was listening
+        self.page_adopted = None
+        self.last_focused = monotonic()
+        # Serialized QWebEngineHistory from a restored session, applied
+        # when the view is created
+        self.pending_history = None
+
+    def ensure_browser(self, page=None):
+        """
+        Create the real QWebEngineView in place of the placeholder, showing
+        page if one is given (a prerendered page), or self.url.
+        Returns True if the view was created by this call.
+        """
+        if self.browser is not None:
+            return False
+
+        # QtWebEngine is imported on first use so that the window can paint
+        # before Chromium is initialised
+        from engine import create_view
+
+        self.browser = create_view(page)
+        startup.mark("first_view_created")
+        self.browser.setMinimumWidth(320)
+        self.browser.setSizePolicy(
+            QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
+        )
+        self.browser.urlChanged.connect(self.on_browser_url_changed)
+
+        self.layout().replaceWidget(self.placeholder, self.browser)
+        self.placeholder.deleteLater()
+        self.placeholder = None
+
+        if self.browser_created:
+            self.browser_created(self)
+        if page is not None:
+            self.pending_history = None
+        elif not self.restore_history():
+            self.browser.setUrl(QUrl(self.url))
+        return True
+
+    def swap_page(self, page):
+        """
+        Show page (a prerendered page) in place of the current one.
+        """
+        old_page = self.browser.page()
+        page.setParent(self.browser)
+        self.browser.setPage(page)
+        old_page.deleteLater()
+
+    def restore_history(self):
+        if not self.pending_history:
+            return False
+        data = QByteArray(self.pending_history)
+        self.pending_history = None
+        stream = QDataStream(data, QIODevice.OpenModeFlag.ReadOnly)
+        try:
+            stream >> self.browser.history()
+        except TypeError:
+            return False
+        return stream.status() == QDataStream.Status.Ok
+
+    def history_state(self):
+        """
+        Return this pane's navigation history serialized to bytes.
+        """
+        if self.browser is None:
+            return self.pending_history
+        data = QByteArray()
+        stream = QDataStream(data, QIODevice.OpenModeFlag.WriteOnly)
+        try:
+            stream << self.browser.history()
+        except TypeError:
+            return None
+        return bytes(data)
+
+    def has_fixed_width(self):
+        return self.minimumWidth() == self.maximumWidth()
+
+    def current_url(self):
+        if self.browser is None:
+            return QUrl(self.url)
+        return self.browser.url()
+
+    def touch(self):
+        self.last_focused = monotonic()
+
+    def blocked_requests(self):
+        """
+        Number of requests of this pane stopped by the content filters.
+        """
+        if self.browser is None or self.browser.page().blocker is None:
+            return 0
+        return self.browser.page().blocker.blocked
+
+    def is_discarded(self):
+        if self.browser is None:
+            return False
+        page = self.browser.page()
+        return page.lifecycleState() == page.LifecycleState.Discarded
+
+    def discard(self):
+        """
+        Drop the renderer state of this pane to free memory.
+        The URL, title and favicon are kept, and the page is reloaded
+        by activate() when the pane is brought back.
+        """
+        if self.browser is None or self.is_discarded():
+            return False
+        page = self.browser.page()
+        # Qt refuses to discard a page that is considered visible
+        page.setVisible(False)
+        page.setLifecycleState(page.LifecycleState.Discarded)
+        return self.is_discarded()
+
+    def freeze(self):
+        """
+        Suspend rendering, timers and most task sources of this pane
+        while it is off screen. Returns True if the pane was frozen.
+        """
+        if self.browser is None:
+            return False
+        page = self.browser.page()
+        if page.lifecycleState() != page.LifecycleState.Active:
+            return False
+        page.setVisible(False)
+        page.setLifecycleState(page.LifecycleState.Frozen)
+        return True
+
+    def thaw(self):
+        """
+        Bring a frozen or discarded pane back to the Active state.
+        Discarded pages are reloaded by Qt on the way.
+        """
+        if self.browser is None:
+            return
+        page = self.browser.page()
+        if page.lifecycleState() != page.LifecycleState.Active:
+            page.setVisible(True)
+            page.setLifecycleState(page.LifecycleState.Active)
+
+    def state(self):
+        """
+        Return one of "placeholder", "active", "frozen" or "discarded".
+        """
+        if self.browser is None:
+            return "placeholder"
+        page = self.browser.page()
+        return {
+            page.LifecycleState.Active: "active",
+            page.LifecycleState.Frozen: "frozen",
+            page.LifecycleState.Discarded: "discarded",
+        }[page.lifecycleState()]
+
+    def activate(self):
+        self.touch()
+        if not self.ensure_browser():
+            self.thaw()
 
     def request_close(self):
         if self.close_requested:
             self.close_requested(self)
 
     def request_grow(self):
+        self.activate()
         main_window = self.window()
         if not main_window:
             return
@@ -112,13 +352,13 @@ class BrowserContainer(QWidget):
             return
 
         scroll_area = main_window.scroll_area
-        scroll_area.widget().adjustSize()
+        strip = scroll_area.widget().layout()
         viewport_width = scroll_area.viewport().width()
-        self.setFixedWidth(viewport_width)
+        strip.set_pane_width(self, viewport_width)
         scroll_area.widget().adjustSize()
 
-        container_pos_x = self.x()
-        container_width = self.width()
+        container_pos_x = strip.pane_x(strip.index_of(self))
+        container_width = strip.pane_width(self)
         view_width = scroll_area.viewport().width()
         desired_scroll_value = (
             container_pos_x + (container_width / 2) - (view_width / 2)
@@ -132,12 +372,74 @@ class BrowserContainer(QWidget):
     def on_browser_url_changed(self, qurl: QUrl):
         self.url_edit.setText(qurl.toString())
 
+    def update_completions(self, text):
+        if self.history is None:
+            return
+        if self.completer is None:
+            self.completer = QCompleter(QStandardItemModel(self), self)
+            self.completer.setCompletionMode(
+                QCompleter.CompletionMode.UnfilteredPopupCompletion
+            )
+            # Rows show "title - url"; choosing one inserts the url
+            self.completer.setCompletionRole(Qt.ItemDataRole.UserRole)
+            self.completer.activated.connect(self.on_completion_activated)
+            self.url_edit.setCompleter(self.completer)
+
+        model = self.completer.model()
+        model.clear()
+        for url, title in self.history.complete(
+            text, settings.value("history/completions")
+        ):
+            item = QStandardItem(f"{title} - {url}" if title else url)
+            item.setData(url, Qt.ItemDataRole.UserRole)
+            model.appendRow(item)
+        if model.rowCount():
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def predict_target(self, text):
+        if self.preloader is not None:
+            self.preloader.typed(self, text)
+
+    def on_completion_activated(self, url):
+        self.url_edit.setText(url)
+        self.on_url_edited()
+
     def on_url_edited(self):
+        started = monotonic()
         text = self.url_edit.text().strip()
+        # Choosing a completion with Enter can also finish editing; only
+        # navigate once per event
+        if text == self.submitted:
+            return
+        self.submitted = text
+        QTimer.singleShot(0, lambda: setattr(self, "submitted", None))
         if text:
             if not (text.startswith("http://") or text.startswith("https://")):
                 text = "http://" + text
-            self.browser.setUrl(QUrl(text))
+            self.url = text
+            page, loaded = None, False
+            if self.preloader is not None:
+                page, loaded = self.preloader.take(self, text)
+            created = self.ensure_browser(page)
+            self.activate()
+            if not created:
+                if page is not None:
+                    self.swap_page(page)
+                else:
+                    self.browser.setUrl(QUrl(text))
+
+            if self.navigation_committed:
+                if page is not None:
+                    mode = "prerender"
+                elif self.preloader is not None and self.preloader.preconnected(text):
+                    mode = "preconnect"
+                else:
+                    mode = "plain"
+                self.navigation_committed(self, text, mode, started, loaded)
+            if page is not None and self.page_adopted:
+                self.page_adopted(self, loaded)
 
 
 class SplitterHandle(QWidget):
@@ -150,13 +452,33 @@ class SplitterHandle(QWidget):
         self.setCursor(Qt.CursorShape.SplitHCursor)
         self.dragging = False
         self.offset = 0
-        self.drag_pixmap = QPixmap(path.join("resources", "drag.png"))
+        self.drag_pixmap = assets.pixmap("drag.png")
+
+        # "live" resizes the pane on every mouse move, "throttled" at most
+        # resize/max_fps times a second and "deferred" only shows an outline
+        # until the button is released
+        self.mode = "live"
+        self.pending_width = None
+        self.relayouts = 0
+        self.move_events = 0
+        self.outline = None
+        self.throttle_timer = QTimer(self)
+        self.throttle_timer.setSingleShot(True)
+        self.throttle_timer.timeout.connect(self.apply_pending_width)
 
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self.dragging = True
             self.start_global_x = event.globalPosition().x()
-            self.start_width = self.left_widget.width()
+            self.start_width = self.container.layout().pane_width(self.left_widget)
+            self.mode = settings.value("resize/mode")
+            self.pending_width = None
+            self.relayouts = 0
+            self.move_events = 0
+            self.press_time = monotonic()
+            if self.mode == "throttled":
+                fps = max(1, settings.value("resize/max_fps"))
+                self.throttle_timer.setInterval(int(1000 / fps))
 
     def mouseMoveEvent(self, event):
         if self.dragging:
@@ -164,12 +486,55 @@ class SplitterHandle(QWidget):
             new_width = self.start_width + delta
             if new_width < 320:
                 new_width = 320
-            self.left_widget.setFixedWidth(int(new_width))
+            self.move_events += 1
+            self.pending_width = int(new_width)
+            if self.mode == "deferred":
+                self.show_outline(self.pending_width)
+            elif self.mode == "throttled":
+                if not self.throttle_timer.isActive():
+                    self.apply_pending_width()
+                    self.throttle_timer.start()
+            else:
+                self.apply_pending_width()
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
             self.dragging = False
+            self.throttle_timer.stop()
+            if self.outline is not None:
+                self.outline.hide()
+            self.apply_pending_width()
             self.container.adjustSize()
+            if settings.value("diagnostics/drag_stats"):
+                print("resize: " + json.dumps(self.resize_stats()), file=sys.stderr)
+
+    def apply_pending_width(self):
+        if self.pending_width is None:
+            return
+        strip = self.container.layout()
+        if strip.pane_width(self.left_widget) != self.pending_width:
+            strip.set_pane_width(self.left_widget, self.pending_width)
+            self.relayouts += 1
+        self.pending_width = None
+
+    def show_outline(self, width):
+        # The pane itself keeps its size; only this frame follows the mouse
+        if self.outline is None:
+            self.outline = QRubberBand(QRubberBand.Shape.Rectangle, self.container)
+        self.outline.setGeometry(
+            self.left_widget.x(), 0, width, self.container.height()
+        )
+        self.outline.show()
+        self.outline.raise_()
+
+    def resize_stats(self):
+        return {
+            "mode": self.mode,
+            "duration_ms": round((monotonic() - self.press_time) * 1000, 1),
+            "move_events": self.move_events,
+            "relayouts": self.relayouts,
+            "width": self.container.layout().pane_width(self.left_widget),
+        }
 
     def paintEvent(self, event):
         super().paintEvent(event)
@@ -180,9 +545,17 @@ class SplitterHandle(QWidget):
 
 
 class Fasemo(QMainWindow):
-    def __init__(self):
+    def __init__(self, initial_urls=None):
         super().__init__()
-        self.setWindowIcon(QIcon(path.join("resources", "helmet.png")))
+        self.profiler = Profiler(
+            settings.value("diagnostics/profile_dir"), self.on_diagnostics_report
+        )
+        if settings.value("diagnostics/profile"):
+            self.profiler.start()
+        # URLs to open at startup after the saved session. None means
+        # "open the default page if there is no session".
+        self.initial_urls = initial_urls
+        self.setWindowIcon(assets.icon("helmet.png"))
 
         central_widget = QWidget()
         central_widget.setObjectName("centralWidget")
@@ -190,8 +563,7 @@ class Fasemo(QMainWindow):
         self.main_layout = QVBoxLayout()
         central_widget.setLayout(self.main_layout)
 
-        self.h_layout = QHBoxLayout()
-        self.h_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        self.h_layout = StripLayout()
 
         self.container = QFrame()
         self.container.setLayout(self.h_layout)
@@ -210,9 +582,23 @@ class Fasemo(QMainWindow):
         self.scroll_area.setWidget(self.container)
         self.main_layout.addWidget(self.scroll_area)
 
-        self.browser_containers = []
-        self.handles = []
-        self.browser_toolbar_actions = []
+        # Viewport changes are coalesced into one update per event loop pass
+        self.viewport_timer = QTimer(self)
+        self.viewport_timer.setSingleShot(True)
+        self.viewport_timer.setInterval(0)
+        self.viewport_timer.timeout.connect(self.update_viewport)
+        self.last_pane_counts = None
+        self.scroll_area.horizontalScrollBar().valueChanged.connect(
+            self.schedule_viewport_update
+        )
+        # Panes in the viewport at the last update, to capture the ones
+        # that leave it
+        self.on_screen = set()
+
+        # The strip layout owns the pane order; this is the same list object
+        self.browser_containers = self.h_layout.panes
+        # BrowserContainer -> (QToolButton, QAction) in the bottom toolbar
+        self.browser_toolbar_actions = {}
 
         screen = QApplication.primaryScreen()
         self.screen_width = screen.availableGeometry().width()
@@ -225,21 +611,44 @@ class Fasemo(QMainWindow):
         self.wallpaper_label.setSizePolicy(
             QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
         )
-        self.wallpaper_pixmap = QPixmap(path.join("resources", "wallpaper2.jpg"))
+        self.wallpaper = WallpaperPipeline(
+            self.wallpaper_label,
+            settings.value("wallpaper/path") or resource_path("wallpaper2.jpg"),
+            settings.value("wallpaper/cache_entries"),
+            settings.value("wallpaper/debounce_ms"),
+            self,
+        )
+        change_wallpaper = QAction("Change wallpaper...", self.wallpaper_label)
+        change_wallpaper.triggered.connect(self.on_change_wallpaper)
+        self.wallpaper_label.addAction(change_wallpaper)
+        self.wallpaper_label.setContextMenuPolicy(
+            Qt.ContextMenuPolicy.ActionsContextMenu
+        )
+
+        self.favicon_cache = FaviconCache(
+            settings.value("favicons/cache_dir"),
+            settings.value("favicons/memory_entries"),
+            settings.value("favicons/disk_limit_kb"),
+        )
+        self.loading_icon = assets.icon("helmet.png")
 
         self.toolbar = QToolBar("Toolbar")
         self.toolbar.setIconSize(QSize(48, 48))
         self.toolbar.setOrientation(Qt.Orientation.Horizontal)
         self.new_button = QToolButton()
-        self.new_icon = QIcon(path.join("resources", "btn-add.png"))
+        self.new_icon = assets.icon("btn-add.png")
         self.new_button.setIcon(self.new_icon)
         self.new_button.clicked.connect(self.on_new_button_clicked)
         self.new_button_action = self.toolbar.addWidget(self.new_button)
+        self.overview_action = QAction("Overview", self)
+        self.overview_action.setShortcut(QKeySequence("Ctrl+Shift+O"))
+        self.overview_action.setToolTip("Overview of all panes (Ctrl+Shift+O)")
+        self.overview_action.triggered.connect(self.toggle_overview)
+        self.toolbar.insertAction(self.new_button_action, self.overview_action)
         self.addToolBar(Qt.ToolBarArea.BottomToolBarArea, self.toolbar)
 
         self.setWindowTitle("Fasemo")
 
-        self.add_browser("https://www.google.com")
         self.showMaximized()
 
         self.h_layout.addWidget(self.wallpaper_label)
@@ -252,15 +661,390 @@ class Fasemo(QMainWindow):
         self.insertion_line.hide()
 
         self.dragged_browser_id = None
+        self.drag_session = None
+        self.last_drag_stats = None
+        self.setAcceptDrops(True)
 
         self.update_container_height()
         self.scroll_area.viewport().installEventFilter(self)
 
-        self.loading_icon = QIcon(path.join("resources", "helmet.png"))
+        # Created with the first view when --cache-report is given
+        self.cache_report = None
+        self.metrics = MetricsRecorder(
+            self, settings.value("metrics/log_path"), parent=self
+        )
+
+        self.history = None
+        if settings.value("history/enabled"):
+            self.history = HistoryStore(
+                settings.value("history/path"), settings.value("history/batch_ms")
+            )
+        self.text_index = None
+        if settings.value("find/enabled"):
+            self.text_index = TextIndex()
+            self.find_box = FindBox(self.text_index, settings.value("find/results"))
+            self.find_box.setFixedWidth(280)
+            self.find_box.pane_chosen = self.show_find_result
+            self.toolbar.insertWidget(self.overview_action, self.find_box)
+            find_action = QAction("Find in panes", self)
+            find_action.setShortcut(QKeySequence("Ctrl+Shift+F"))
+            find_action.triggered.connect(self.focus_find_box)
+            self.addAction(find_action)
+        self.preloader = None
+        if settings.value("preload/enabled"):
+            self.preloader = Preloader(self.history, self)
+
+        self.thumbnails = ThumbnailCache(
+            settings.value("thumbnails/width"),
+            settings.value("thumbnails/memory_kb"),
+            self,
+        )
+        # Laid over the strip rather than replacing it, so the views are
+        # not hidden and shown again (showing a frozen page thaws it)
+        self.overview = Overview(self.thumbnails, central_widget)
+        self.overview.pane_chosen = self.leave_overview
+        self.overview.cover(self.scroll_area)
+        self.overview.hide()
+
+        self.loads = LoadScheduler(
+            self,
+            settings.value("loads/max_concurrent"),
+            settings.value("loads/timeout_ms"),
+            self.on_load_report,
+            self,
+        )
+
+        self.session_store = SessionStore(settings.value("session/path"))
+        self.session_timer = QTimer(self)
+        self.session_timer.setInterval(settings.value("session/autosave_ms"))
+        self.session_timer.timeout.connect(self.save_session)
+
+        # The first pane (or the saved session) is opened once the chrome
+        # has painted
+        self.initial_panes_opened = False
+        self.installEventFilter(self)
+
+        self.memory_monitor = MemoryMonitor(
+            self,
+            settings.value("memory/budget_mb"),
+            settings.value("memory/sample_interval_ms"),
+            self,
+        )
+        QApplication.instance().focusChanged.connect(self.on_focus_changed)
+
+        profile_action = QAction("Profile", self)
+        profile_action.setShortcut(QKeySequence("Ctrl+Shift+P"))
+        profile_action.triggered.connect(self.profiler.toggle)
+        self.addAction(profile_action)
+        self.watchdog = None
+        if settings.value("diagnostics/watchdog"):
+            self.watchdog = StallWatchdog(
+                settings.value("diagnostics/stall_ms"), self.on_diagnostics_report, self
+            )
+        if settings.value("diagnostics/layout_counts"):
+            self.action_counter = ActionCounter(
+                self.h_layout, self.on_diagnostics_report, self
+            )
+            QApplication.instance().installEventFilter(self.action_counter)
+
+    def on_focus_changed(self, old, now):
+        # Walk up from the focused widget to find the pane that owns it
+        widget = now
+        while widget is not None and not isinstance(widget, BrowserContainer):
+            widget = widget.parentWidget()
+        if widget is not None:
+            widget.touch()
+
+    def schedule_viewport_update(self):
+        self.viewport_timer.start()
+
+    def update_viewport(self):
+        """
+        Create the web views of panes that have scrolled into view,
+        thaw panes near the viewport and freeze the ones far outside it.
+        """
+        visible = self.visible_browsers()
+        for bc in visible:
+            self.loads.request(bc)
+        # Last chance to capture these before they are frozen
+        for bc in self.on_screen.difference(visible):
+            self.thumbnails.capture(bc)
+        self.on_screen = set(visible)
+
+        if settings.value("lifecycle/freeze_offscreen"):
+            nearby = set(
+                self.visible_browsers(settings.value("lifecycle/freeze_margin_px"))
+            )
+            for bc in self.browser_containers:
+                # Freezing a page mid-load would stall it in its slot
+                if bc in nearby or self.loads.loading(bc):
+                    bc.thaw()
+                else:
+                    bc.freeze()
+
+        counts = self.pane_state_counts()
+        if counts != self.last_pane_counts:
+            self.last_pane_counts = counts
+            if settings.value("lifecycle/report_pane_states"):
+                print(
+                    "panes: "
+                    + ", ".join(f"{state}={n}" for state, n in counts.items()),
+                    file=sys.stderr,
+                )
+
+    def pane_state_counts(self):
+        """
+        Count panes by lifecycle state (see BrowserContainer.state).
+        """
+        counts = {"active": 0, "frozen": 0, "discarded": 0, "placeholder": 0}
+        for bc in self.browser_containers:
+            counts[bc.state()] += 1
+        return counts
+
+    def viewport_distance(self, bc):
+        """
+        Distance in pixels from the centre of a pane to the centre of the
+        viewport.
+        """
+        pane_center = (
+            self.h_layout.pane_x(self.h_layout.index_of(bc))
+            + self.h_layout.pane_width(bc) / 2
+        )
+        view_center = (
+            self.scroll_area.horizontalScrollBar().value()
+            + self.scroll_area.viewport().width() / 2
+        )
+        return abs(pane_center - view_center)
+
+    def visible_browsers(self, margin=0):
+        """
+        Return the BrowserContainers that intersect the scroll area viewport,
+        widened by margin pixels on each side.
+        """
+        left = self.scroll_area.horizontalScrollBar().value() - margin
+        right = left + self.scroll_area.viewport().width() + 2 * margin
+        return self.h_layout.panes_between(left, right)
+
+    def open_initial_panes(self):
+        state = None
+        if settings.value("session/enabled"):
+            state = self.session_store.load()
+        restored = bool(state and state.get("panes") and self.restore_session(state))
+        if self.initial_urls is not None:
+            self.open_urls(self.initial_urls)
+        elif not restored:
+            self.add_browser("https://www.google.com")
+        if settings.value("session/enabled"):
+            self.session_timer.start()
+
+    def open_urls(self, urls):
+        """
+        Open a pane for each URL. All of them are queued to load, nearest
+        to the viewport first, a few at a time (see LoadScheduler).
+        """
+        panes = [self.add_browser(url) for url in urls]
+        for bc in panes:
+            self.loads.request(bc)
+        return panes
+
+    def open_forwarded_urls(self, urls):
+        """
+        Open the URLs handed over by a later launch and bring the window
+        to the front, showing the first new pane.
+        """
+        panes = self.open_urls(urls)
+        self.setWindowState(
+            (self.windowState() & ~Qt.WindowState.WindowMinimized)
+            | Qt.WindowState.WindowActive
+        )
+        self.raise_()
+        self.activateWindow()
+        if panes:
+            self.center_browser(panes[0])
+
+    def toggle_overview(self):
+        if self.overview.isVisible():
+            self.leave_overview(None)
+        else:
+            self.show_overview()
+
+    def show_overview(self):
+        """
+        Lay a grid of pane thumbnails over the strip. Panes on screen are
+        running anyway and are captured afresh; every other pane shows its
+        cached thumbnail, or its favicon.
+        """
+        for bc in self.visible_browsers():
+            self.thumbnails.capture(bc)
+        entries = []
+        for bc in self.browser_containers:
+            title = bc.browser.title() if bc.browser is not None else ""
+            button = self.toolbar_button_for_browser(bc)
+            entries.append(
+                (
+                    bc,
+                    title or bc.current_url().toString(),
+                    button.icon() if button else None,
+                )
+            )
+        self.overview.populate(entries)
+        self.overview.show()
+        self.overview.raise_()
+        self.overview.setFocus()
+
+    def leave_overview(self, bc):
+        self.overview.hide()
+        if bc is not None:
+            self.center_browser(bc)
+
+    def focus_find_box(self):
+        self.find_box.setFocus()
+        self.find_box.selectAll()
+
+    def index_pane_text(self, bc):
+        """
+        Extract the visible text of bc for the cross-pane search, now and
+        whenever the page later changes enough of it.
+        """
+        from engine import extract_text
+
+        page = bc.browser.page()
+        page.text_changed = lambda: self.index_pane_text(bc)
+        extract_text(page, lambda result: self.on_pane_text(bc, result), MAX_TEXT)
+
+    def on_pane_text(self, bc, result):
+        # The pane or the window closed while the script ran
+        if (
+            self.text_index is None
+            or not isinstance(result, dict)
+            or bc not in self.browser_toolbar_actions
+        ):
+            return
+        self.text_index.submit(
+            bc, bc.current_url().toString(), result.get("title"), result.get("text")
+        )
+
+    def show_find_result(self, bc, word):
+        self.center_browser(bc)
+        bc.browser.findText(word)
+
+    def on_load_report(self, record):
+        self.metrics.write(record)
+        if settings.value("diagnostics/load_stats"):
+            print("load: " + json.dumps(record), file=sys.stderr)
+
+    def on_diagnostics_report(self, record):
+        self.metrics.write(record)
+        if record["event"] == "stall":
+            print(f"stall: {record['duration_ms']} ms", file=sys.stderr)
+            for line in record["stack"]:
+                print(line, file=sys.stderr)
+        elif record["event"] == "profile":
+            print(
+                f"profile: {record['duration_ms']} ms, written to {record['path']}",
+                file=sys.stderr,
+            )
+            print(record["top"], file=sys.stderr)
+        else:
+            print("layout: " + json.dumps(record), file=sys.stderr)
+
+    def session_state(self):
+        """
+        Describe the strip for SessionStore: pane order, URLs, user-set
+        widths, scroll position and optionally navigation history.
+        """
+        save_history = settings.value("session/save_history")
+        panes = []
+        for bc in self.browser_containers:
+            entry = {"url": bc.current_url().toString()}
+            if bc.has_fixed_width():
+                entry["width"] = self.h_layout.pane_width(bc)
+            if save_history:
+                history = bc.history_state()
+                if history:
+                    entry["history"] = base64.b64encode(history).decode("ascii")
+            panes.append(entry)
+        return {
+            "scroll": self.scroll_area.horizontalScrollBar().value(),
+            "panes": panes,
+        }
+
+    def restore_session(self, state):
+        """
+        Recreate the strip from a saved session. Every pane starts as a
+        placeholder; only the ones in the viewport load right away.
+        """
+        restored = 0
+        for entry in state["panes"]:
+            url = entry.get("url") if isinstance(entry, dict) else None
+            if not url or not isinstance(url, str):
+                continue
+            bc = self.add_browser(url)
+            width = number(entry.get("width"))
+            if width and width > 0:
+                # Qt's largest widget size
+                self.h_layout.set_pane_width(bc, min(max(width, MIN_PANE_WIDTH), 16777215))
+            if entry.get("history"):
+                try:
+                    bc.pending_history = base64.b64decode(entry["history"])
+                except (TypeError, ValueError):
+                    pass
+            restored += 1
+        if not restored:
+            return False
+
+        self.container.adjustSize()
+        scroll_bar = self.scroll_area.horizontalScrollBar()
+        scroll = number(state.get("scroll")) or 0
+        scroll_bar.setValue(int(min(max(scroll, 0), scroll_bar.maximum())))
+        return True
+
+    def save_session(self):
+        if settings.value("session/enabled") and self.initial_panes_opened:
+            self.session_store.save(self.session_state())
+
+    def closeEvent(self, event):
+        self.save_session()
+        self.profiler.stop()
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        if self.cache_report is not None:
+            self.cache_report.write(settings.value("profile/cache_report"))
+        if settings.value("engine/renderer_report"):
+            write_renderer_report(
+                self.browser_containers, settings.value("engine/renderer_report")
+            )
+        self.metrics.close()
+        # Panes and the preloader outlive the window's stores for a moment
+        for bc in self.browser_containers:
+            bc.history = None
+            bc.preloader = None
+        if self.preloader is not None:
+            self.preloader.typing_timer.stop()
+            self.preloader.history = None
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+        if self.text_index is not None:
+            for bc in self.browser_containers:
+                if bc.browser is not None:
+                    bc.browser.page().text_changed = None
+            self.text_index.close()
+            self.text_index = None
+        super().closeEvent(event)
 
     def eventFilter(self, source, event):
+        if (
+            source is self
+            and event.type() == QEvent.Type.Paint
+            and not self.initial_panes_opened
+        ):
+            self.initial_panes_opened = True
+            startup.mark("first_paint")
+            QTimer.singleShot(0, self.open_initial_panes)
         if source == self.scroll_area.viewport() and event.type() == QEvent.Type.Resize:
             self.update_container_height()
+            self.schedule_viewport_update()
         return super().eventFilter(source, event)
 
     def update_container_height(self):
@@ -268,17 +1052,17 @@ class Fasemo(QMainWindow):
         viewport_height = self.scroll_area.viewport().height()
         self.container.setFixedHeight(viewport_height)
 
+    def on_change_wallpaper(self):
+        file_name, _ = QFileDialog.getOpenFileName(
+            self, "Choose wallpaper", "", "Images (*.png *.jpg *.jpeg *.bmp *.webp)"
+        )
+        if file_name and self.wallpaper.set_image(file_name):
+            settings.set_value("wallpaper/path", file_name)
+
     def resizeEvent(self, event):
         super().resizeEvent(event)
-        if self.wallpaper_label is not None and self.wallpaper_pixmap is not None:
-            scaled_pixmap = self.wallpaper_pixmap.scaled(
-                self.wallpaper_label.size(),
-                Qt.AspectRatioMode.KeepAspectRatioByExpanding,
-                Qt.TransformationMode.SmoothTransformation,
-            )
-            self.wallpaper_label.setPixmap(scaled_pixmap)
-
-        # Also ensure container matches new viewport height on window resize
+        # The wallpaper rescales itself when its label is resized
+        # (see WallpaperPipeline). Also ensure container matches new viewport height on window resize
         self.update_container_height()
 
     def reinsert_browser(self, dragged_bc: BrowserContainer, pos: QPoint):
@@ -287,116 +1071,193 @@ class Fasemo(QMainWindow):
         remove the browser container from the old layout index
         and insert it at the new calculated index.
         """
-        old_index = self.browser_containers.index(dragged_bc)
+        old_index = self.h_layout.index_of(dragged_bc)
         insert_index = self.calculate_insert_index(pos)
 
-        # Remove it from the layout
-        self.remove_browser_from_layout(old_index)
-
         # If we're moving the container from left to right in the same row,
         # the final insert_index will shift by one.
         if old_index < insert_index:
             insert_index -= 1
 
-        # Insert it at the new location
-        self.insert_browser_at_index(dragged_bc, insert_index)
-
-        # Ensure everything is resized properly and the insertion line is hidden
-        self.container.adjustSize()
+        # Only the panes between the old and new index are relaid out
+        self.h_layout.move_pane(dragged_bc, insert_index)
         self.insertion_line.hide()
 
-        # Move the wallpaper_label to the end again
-        self.h_layout.removeWidget(self.wallpaper_label)
-        self.h_layout.addWidget(self.wallpaper_label)
+        self.move_browser_button(dragged_bc)
 
-        # <-- Rebuild toolbar icons
-        self.reorder_toolbar()
+    def toolbar_action_after(self, bc):
+        """
+        Return the toolbar action of the pane to the right of bc,
+        or None if bc is the last pane.
+        """
+        index = self.h_layout.index_of(bc)
+        if index + 1 < len(self.browser_containers):
+            return self.browser_toolbar_actions[self.browser_containers[index + 1]][1]
+        return None
 
     def add_browser_button(self, bc):
+        """
+        Create the toolbar button for bc at the position matching
+        its place in browser_containers.
+        """
         btn = QToolButton()
         btn.setText("")
         btn.clicked.connect(
             lambda checked, browser_container=bc: self.center_browser(browser_container)
         )
-        action = self.toolbar.addWidget(btn)
-        self.browser_toolbar_actions.append((btn, action))
+        before = self.toolbar_action_after(bc)
+        if before is None:
+            action = self.toolbar.addWidget(btn)
+        else:
+            action = self.toolbar.insertWidget(before, btn)
+        self.browser_toolbar_actions[bc] = (btn, action)
         self.updateButtonIcon(btn, bc.browser)
 
+        # Show the last known favicon for the site until the page has one
+        if btn.icon().isNull():
+            cached = self.favicon_cache.get(bc.current_url().host())
+            if cached is not None:
+                btn.setIcon(cached)
+                btn.setIconSize(QSize(64, 64))
+
+    def move_browser_button(self, bc):
+        """
+        Move the existing toolbar button of bc to match its new
+        place in browser_containers.
+        """
+        btn, action = self.browser_toolbar_actions[bc]
+        # Inserting an action the toolbar already has moves it
+        self.toolbar.insertAction(self.toolbar_action_after(bc), action)
+
+    def remove_browser_button(self, bc):
+        btn, action = self.browser_toolbar_actions.pop(bc)
+        self.toolbar.removeAction(action)
+        # Deleting the action also deletes the button it owns
+        action.deleteLater()
+
     def add_browser(self, url: str):
         bc = BrowserContainer(url)
         bc.close_requested = self.close_browser
-        
-        # Connect signals for showing the loading icon
-        bc.browser.loadStarted.connect(lambda: self.on_load_started(bc.browser))
-        bc.browser.iconChanged.connect(lambda icon: self.on_browser_icon_changed(bc.browser, icon))
-        bc.browser.loadFinished.connect(lambda ok: self.on_load_finished(bc.browser, ok))
-
-        self.h_layout.addWidget(bc)
-        self.browser_containers.append(bc)
+        bc.browser_created = self.on_browser_created
+        bc.history = self.history
+        bc.preloader = self.preloader
+        bc.navigation_committed = self.metrics.track_commit
+        bc.page_adopted = self.on_page_adopted
 
         handle = SplitterHandle(bc, self.container)
-        self.h_layout.addWidget(handle)
-        self.handles.append(handle)
+        self.h_layout.insert_pane(len(self.browser_containers), bc, handle)
 
-        self.container.adjustSize()
+        self.add_browser_button(bc)
 
-        if hasattr(self, "toolbar"):
-            self.add_browser_button(bc)
+        self.schedule_viewport_update()
+        return bc
 
-        self.h_layout.removeWidget(self.wallpaper_label)
-        self.h_layout.addWidget(self.wallpaper_label)
+    def on_browser_created(self, bc):
+        if self.cache_report is None and settings.value("profile/cache_report"):
+            from engine import CacheReport
+
+            self.cache_report = CacheReport()
 
-        self.reorder_toolbar()
+        self.metrics.attach(bc)
+        if self.history is not None:
+            bc.browser.urlChanged.connect(lambda url: self.record_visit(url))
+            bc.browser.titleChanged.connect(lambda title: self.record_title(bc, title))
 
-    def toolbar_button_for_browser(self, browser):
+        # Connect signals for showing the loading icon. This happens once
+        # per pane; reordering the strip never reconnects anything.
+        bc.browser.loadStarted.connect(lambda: self.on_load_started(bc))
+        bc.browser.iconChanged.connect(lambda icon: self.on_browser_icon_changed(bc, icon))
+        bc.browser.loadFinished.connect(lambda ok: self.on_load_finished(bc, ok))
+
+    def record_visit(self, url):
+        # Pages can still navigate after the store was closed on exit
+        if self.history is not None:
+            self.history.record_visit(url.toString())
+
+    def record_title(self, bc, title):
+        if self.history is not None:
+            self.history.record_title(bc.browser.url().toString(), title)
+
+    def toolbar_button_for_browser(self, bc):
         """
-        Given a QWebEngineView, return the corresponding QToolButton from browser_toolbar_actions.
+        Given a BrowserContainer, return its QToolButton, or None if it has none.
         """
-        # Each entry in self.browser_toolbar_actions is (btn, action),
-        # in the same order as self.browser_containers.
-        # So if we find the index of the bc that has .browser == browser,
-        # we can return the corresponding button.
-        for i, bc in enumerate(self.browser_containers):
-            if bc.browser == browser:
-                return self.browser_toolbar_actions[i][0]  # The button
-        return None
+        entry = self.browser_toolbar_actions.get(bc)
+        return entry[0] if entry else None
 
-    def on_load_started(self, browser):
+    def on_load_started(self, bc):
         """
         Called when a browser begins loading a page.
-        Replace toolbar icon with the loading.gif.
+        Show the cached favicon for the site if there is one,
+        otherwise the loading icon.
         """
-        button = self.toolbar_button_for_browser(browser)
+        button = self.toolbar_button_for_browser(bc)
         if button:
-            button.setIcon(self.loading_icon)
+            cached = self.favicon_cache.get(bc.current_url().host())
+            button.setIcon(cached if cached is not None else self.loading_icon)
 
-    def on_browser_icon_changed(self, browser, icon):
+    def on_browser_icon_changed(self, bc, icon):
         """
         Called whenever the browser's favicon changes.
         If the icon is not null, use it immediately (page's real favicon).
         """
         if not icon.isNull():
-            button = self.toolbar_button_for_browser(browser)
+            self.favicon_cache.put(
+                bc.browser.url().host(), icon, bc.browser.iconUrl().toString()
+            )
+            button = self.toolbar_button_for_browser(bc)
             if button:
                 button.setIcon(icon)
+                button.setIconSize(QSize(64, 64))
 
-    def on_load_finished(self, browser, ok):
+    def on_load_finished(self, bc, ok):
         """
         Called when the browser finishes loading.
         - If ok == True, the page loaded successfully.
         - If the final icon is still null, you may want a fallback icon.
         """
+        if ok and self.cache_report is not None:
+            self.cache_report.collect(bc.browser.page())
+        if ok:
+            self.thumbnails.capture_later(bc)
+            if self.text_index is not None:
+                self.index_pane_text(bc)
+
+        button = self.toolbar_button_for_browser(bc)
+        if button and bc.browser.page().blocker is not None:
+            button.setToolTip(f"{bc.blocked_requests()} requests blocked")
+
+        if startup.enabled:
+            # A failed load (DNS error, error page) is no startup time
+            startup.mark("first_load_finished" if ok else "first_load_failed")
+            startup.note("first_load_ok", ok)
+            startup.finish()
+            QApplication.instance().quit()
+
         # In some cases, the site never provides a favicon, or the icon might remain null.
         # If you want to show a fallback (like a default "web" icon), do it here if icon is still null:
-        icon = browser.icon()
+        icon = bc.browser.icon()
         if icon.isNull():
             # e.g. use a fallback icon, or keep the loading icon, etc.
-            button = self.toolbar_button_for_browser(browser)
+            button = self.toolbar_button_for_browser(bc)
             if button:
-                fallback_icon = QIcon(path.join("resources", "btn-default-favicon.png"))
-                button.setIcon(fallback_icon)
+                button.setIcon(self.favicon_cache.fallback_icon())
+
+    def on_page_adopted(self, bc, loaded):
+        """
+        Run the load handling a prerendered page missed, timed from the
+        moment the pane showed it.
+        """
+        self.metrics.on_load_started(bc)
+        self.on_load_started(bc)
+        self.on_browser_icon_changed(bc, bc.browser.icon())
+        if loaded:
+            self.metrics.on_load_finished(bc, True)
+            self.on_load_finished(bc, True)
 
     def updateButtonIcon(self, button, browser):
+        if browser is None:
+            return
         icon = browser.icon()
         if not icon.isNull():
             button.setIcon(icon)
@@ -407,50 +1268,33 @@ class Fasemo(QMainWindow):
         self.add_browser("https://www.google.com")
 
     def close_browser(self, bc: BrowserContainer):
-        if bc not in self.browser_containers:
+        if bc not in self.browser_toolbar_actions:
             return
-        index = self.browser_containers.index(bc)
-
-        item_to_remove = self.find_layout_item(self.h_layout, bc)
-        if item_to_remove is not None:
-            self.h_layout.removeItem(item_to_remove)
-        self.h_layout.removeWidget(bc)
-        bc.setParent(None)
-        self.browser_containers.remove(bc)
-
-        # Remove corresponding handle
-        if index < len(self.handles):
-            handle = self.handles[index]
-            handle_item = self.find_layout_item(self.h_layout, handle)
-            if handle_item is not None:
-                self.h_layout.removeItem(handle_item)
-            self.h_layout.removeWidget(handle)
-            handle.setParent(None)
-            self.handles.pop(index)
 
         # Remove corresponding toolbar button
-        if index < len(self.browser_toolbar_actions):
-            btn, action = self.browser_toolbar_actions[index]
-            self.toolbar.removeAction(action)
-            self.browser_toolbar_actions.pop(index)
-
-        self.container.adjustSize()
-
-        # <-- Call reorder_toolbar here
-        self.reorder_toolbar()
-
-    def find_layout_item(self, layout, widget):
-        for i in range(layout.count()):
-            item = layout.itemAt(i)
-            if item and item.widget() == widget:
-                return item
-        return None
+        self.remove_browser_button(bc)
+        self.metrics.detach(bc)
+        self.loads.forget(bc)
+        self.thumbnails.forget(bc)
+        if self.text_index is not None:
+            self.text_index.remove(bc)
+        self.on_screen.discard(bc)
+        if self.overview.isVisible():
+            self.leave_overview(None)
+        if self.preloader is not None:
+            self.preloader.forget(bc)
+
+        # Remove the pane and its handle from the strip
+        handle = self.h_layout.remove_pane(bc)
+        bc.setParent(None)
+        handle.setParent(None)
 
     def center_browser(self, bc: BrowserContainer):
+        bc.activate()
         scroll_area = self.scroll_area
         scroll_area.widget().adjustSize()
-        container_pos_x = bc.x()
-        container_width = bc.width()
+        container_pos_x = self.h_layout.pane_x(self.h_layout.index_of(bc))
+        container_width = self.h_layout.pane_width(bc)
         view_width = scroll_area.viewport().width()
         desired_scroll_value = (
             container_pos_x + (container_width / 2) - (view_width / 2)
@@ -461,50 +1305,22 @@ class Fasemo(QMainWindow):
         desired_scroll_value = min(desired_scroll_value, h_scrollbar.maximum())
         h_scrollbar.setValue(int(desired_scroll_value))
 
-    def reorder_toolbar(self):
-        """
-        Rebuild the toolbar so that its icons match the current
-        left-to-right order of browser_containers.
-        Keeps the 'New' button at the far left.
-        """
-        # 1) Capture the action for the "New" button so we can re-add it.
-        new_button_action = None
-        for action in self.toolbar.actions():
-            widget = self.toolbar.widgetForAction(action)
-            if widget == self.new_button:
-                new_button_action = action
-                break
-
-        # 2) Remove all actions from the toolbar.
-        for action in self.toolbar.actions():
-            self.toolbar.removeAction(action)
-        self.browser_toolbar_actions.clear()
-
-        # 3) Re-add the "New" button first (keeps it on the left).
-        if new_button_action is not None:
-            self.toolbar.addAction(new_button_action)
-
-        # 4) Re-add each browser in order:
-        for bc in self.browser_containers:
-            btn = QToolButton()
-            btn.setText("")
-            btn.clicked.connect(
-                lambda checked=False, container=bc: self.center_browser(container)
-            )
-            action = self.toolbar.addWidget(btn)
-            self.browser_toolbar_actions.append((btn, action))
-
-            # Keep the icon in sync with the browser’s favicon
-            bc.browser.iconChanged.connect(
-                lambda _, br=bc.browser, bt=btn: self.updateButtonIcon(bt, br)
-            )
-            self.updateButtonIcon(btn, bc.browser)
-
     # -------- Drag and Drop Handling --------
     def dragEnterEvent(self, event):
         # Only accept if we have our custom MIME
         if event.mimeData().hasFormat("application/x-fasemo-browser"):
             event.acceptProposedAction()
+            self.end_drag_session()
+            self.drag_session = DragSession(self, self)
+
+    def end_drag_session(self):
+        if self.drag_session is None:
+            return
+        self.last_drag_stats = self.drag_session.finish()
+        self.drag_session.deleteLater()
+        self.drag_session = None
+        if settings.value("diagnostics/drag_stats"):
+            print("drag: " + json.dumps(self.last_drag_stats), file=sys.stderr)
 
     def dragMoveEvent(self, event):
         if not event.mimeData().hasFormat("application/x-fasemo-browser"):
@@ -519,7 +1335,8 @@ class Fasemo(QMainWindow):
             self.mapToGlobal(event.position().toPoint())
         )
 
-        self.show_insertion_indicator(pos_in_container)
+        if self.drag_session is not None:
+            self.drag_session.move(pos_in_container)
 
     def dropEvent(self, event):
         if not event.mimeData().hasFormat("application/x-fasemo-browser"):
@@ -527,17 +1344,14 @@ class Fasemo(QMainWindow):
             return
 
         event.acceptProposedAction()
+        self.end_drag_session()
 
         dropped_id = (
             event.mimeData().data("application/x-fasemo-browser").data().decode("utf-8")
         )
 
         # Locate the dragged BrowserContainer by id
-        dragged_bc = None
-        for bc in self.browser_containers:
-            if str(id(bc)) == dropped_id:
-                dragged_bc = bc
-                break
+        dragged_bc = self.h_layout.pane_for_id(dropped_id)
         if not dragged_bc:
             return
 
@@ -548,85 +1362,359 @@ class Fasemo(QMainWindow):
 
         self.reinsert_browser(dragged_bc, pos_in_container)
 
-    def show_insertion_indicator(self, pos: QPoint):
-        insert_index = self.calculate_insert_index(pos)
-
-        self.container.adjustSize()
-        self.container.layout().update()
-
-        if insert_index < len(self.browser_containers):
-            reference_browser = self.browser_containers[insert_index]
-            x_pos = reference_browser.x() - 17
-        else:
-            if self.browser_containers:
-                last_browser = self.browser_containers[-1]
-                last_handle = self.handles[-1]
-                x_pos = (
-                    last_browser.x() + last_browser.width() + last_handle.width() - 5
-                )
-            else:
-                x_pos = 0
-
+    def place_insertion_line(self, x_pos):
         self.insertion_line.move(x_pos, 0)
-        self.insertion_line.setFixedHeight(self.container.height())
+        if self.insertion_line.height() != self.container.height():
+            self.insertion_line.setFixedHeight(self.container.height())
         self.insertion_line.show()
 
     def calculate_insert_index(self, pos: QPoint):
-        x_accum = 0
-        for i, bc in enumerate(self.browser_containers):
-            bc_width = bc.width() + self.handles[i].width()
-            if pos.x() < x_accum + bc.width() / 2:
-                return i
-            x_accum += bc_width
-
-        return len(self.browser_containers)
-
-    def remove_browser_from_layout(self, index):
-        bc = self.browser_containers.pop(index)
-        handle = self.handles.pop(index)
-
-        item_to_remove = self.find_layout_item(self.h_layout, bc)
-        if item_to_remove:
-            self.h_layout.removeItem(item_to_remove)
-        self.h_layout.removeWidget(bc)
-        bc.setParent(None)
-
-        handle_item = self.find_layout_item(self.h_layout, handle)
-        if handle_item:
-            self.h_layout.removeItem(handle_item)
-        self.h_layout.removeWidget(handle)
-        handle.setParent(None)
-
-        # Also update toolbar:
-        btn, action = self.browser_toolbar_actions.pop(index)
-        self.toolbar.removeAction(action)
+        return self.h_layout.insert_index_at(pos.x())
 
-    def insert_browser_at_index(self, bc, index):
-        browser_pos = self.calculate_layout_position_for_browser(index)
-        self.h_layout.insertWidget(browser_pos, bc)
-        self.browser_containers.insert(index, bc)
+    def dragLeaveEvent(self, event):
+        self.end_drag_session()
+        self.insertion_line.hide()
+        event.accept()
 
-        handle = SplitterHandle(bc, self.container)
-        self.h_layout.insertWidget(browser_pos + 1, handle)
-        self.handles.insert(index, handle)
 
-        self.add_browser_button(bc)
+# Chromium switches for each renderer process model
+PROCESS_MODEL_FLAGS = {
+    "default": [],
+    "process-per-site": ["--process-per-site"],
+    "site-per-process": ["--site-per-process"],
+    "single-process": ["--single-process"],
+}
+
+
+def apply_process_model():
+    """
+    Pass the configured process model to Chromium. Must run before the
+    QApplication is created.
+    """
+    flags = list(PROCESS_MODEL_FLAGS.get(settings.value("engine/process_model"), []))
+    limit = settings.value("engine/renderer_process_limit")
+    if limit > 0:
+        flags.append(f"--renderer-process-limit={limit}")
+    if flags:
+        existing = os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "")
+        os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = " ".join([existing] + flags).strip()
+
+
+def parse_arguments(argv):
+    """
+    Parse Fasemo's own options, leaving anything else for Qt.
+    """
+    parser = argparse.ArgumentParser(prog="fasemo")
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        metavar="MB",
+        help="renderer memory budget before idle panes are discarded (0 = off)",
+    )
+    parser.add_argument(
+        "--no-freeze",
+        action="store_true",
+        help="keep panes that are scrolled out of view running",
+    )
+    parser.add_argument(
+        "--pane-stats",
+        action="store_true",
+        help="print pane lifecycle counts to stderr whenever they change",
+    )
+    parser.add_argument(
+        "--wallpaper",
+        metavar="IMAGE",
+        help="use IMAGE as the wallpaper for this run",
+    )
+    parser.add_argument(
+        "--measure-startup",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="record startup timings as a JSON line (to FILE, or stderr) and "
+        "exit once the first page has loaded",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=["disk", "memory", "none"],
+        help="HTTP cache type of the shared profile (memory suits kiosks)",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        metavar="MB",
+        help="maximum size of the HTTP disk cache (0 = let Chromium decide)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="directory for the HTTP disk cache",
+    )
+    parser.add_argument(
+        "--cache-report",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="on exit, write HTTP cache hit and size statistics as a JSON line "
+        "(to FILE, or stdout)",
+    )
+    parser.add_argument(
+        "--process-model",
+        choices=list(PROCESS_MODEL_FLAGS),
+        help="Chromium renderer process model (trades isolation for memory)",
+    )
+    parser.add_argument(
+        "--renderer-limit",
+        type=int,
+        metavar="N",
+        help="maximum number of renderer processes (0 = no limit)",
+    )
+    parser.add_argument(
+        "--renderer-report",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help="on exit, write each pane's renderer PID and memory as a JSON line "
+        "(to FILE, or stdout)",
+    )
+    parser.add_argument(
+        "--metrics-log",
+        metavar="FILE",
+        help="append per-pane navigation metrics to FILE as JSON lines",
+    )
+    parser.add_argument(
+        "--drag-stats",
+        action="store_true",
+        help="print event, frame and timing counts of each pane drag or resize to stderr",
+    )
+    parser.add_argument(
+        "--resize-mode",
+        choices=["live", "deferred", "throttled"],
+        help="how a pane follows its resize handle while it is dragged",
+    )
+    parser.add_argument(
+        "--resize-fps",
+        type=int,
+        metavar="N",
+        help="maximum pane relayouts per second in throttled resize mode",
+    )
+    parser.add_argument(
+        "--filter-list",
+        action="append",
+        metavar="FILE",
+        help="block requests matched by this EasyList-style filter list (repeatable)",
+    )
+    parser.add_argument(
+        "--preload",
+        action="store_true",
+        help="preconnect to or prerender the likely target while typing in a URL bar",
+    )
+    parser.add_argument(
+        "--no-history",
+        action="store_true",
+        help="don't record browsing history or offer URL completions",
+    )
+    parser.add_argument(
+        "--no-find",
+        action="store_true",
+        help="don't index the text of open pages for the find-in-panes box",
+    )
+    parser.add_argument(
+        "--no-session",
+        action="store_true",
+        help="don't restore or save the pane session for this run",
+    )
+    parser.add_argument(
+        "--url-file",
+        action="append",
+        metavar="FILE",
+        help="open every URL listed in FILE, one per line ('-' reads standard input)",
+    )
+    parser.add_argument(
+        "--new-instance",
+        action="store_true",
+        help="start a separate instance instead of handing the URLs to a running one",
+    )
+    parser.add_argument(
+        "--max-loads",
+        type=int,
+        metavar="N",
+        help="maximum number of panes loading at the same time (0 = no limit)",
+    )
+    parser.add_argument(
+        "--load-stats",
+        action="store_true",
+        help="print the queue depth and wait time of every scheduled pane load to stderr",
+    )
+    parser.add_argument(
+        "--diagnose",
+        action="store_true",
+        help="report UI thread stalls with a stack trace, and the layout work of each user action, to stderr",
+    )
+    parser.add_argument(
+        "--stall-ms",
+        type=int,
+        metavar="MS",
+        help="shortest UI thread stall reported by --diagnose (default 200)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="profile the UI thread from launch until Ctrl+Shift+P or exit",
+    )
+    parser.add_argument(
+        "--render",
+        metavar="DIR",
+        help="render the given URLs into DIR without a window, then exit",
+    )
+    parser.add_argument(
+        "--render-format",
+        choices=["pdf", "png", "both"],
+        help="what --render saves of each page (default both)",
+    )
+    parser.add_argument(
+        "--render-pool",
+        type=int,
+        metavar="N",
+        help="pages --render loads at the same time (default 4)",
+    )
+    parser.add_argument(
+        "--render-timeout",
+        type=int,
+        metavar="MS",
+        help="time --render allows each page to load and be saved (default 30000)",
+    )
+    args, rest = parser.parse_known_args(argv[1:])
+    args.urls, qt_args = split_urls(rest)
+    for file_path in args.url_file or []:
+        args.urls += read_url_file(file_path)
+    return args, qt_args
+
+
+# Qt's own command line options that take a value
+QT_VALUE_OPTIONS = {
+    "-platform",
+    "-platformpluginpath",
+    "-platformtheme",
+    "-plugin",
+    "-qmljsdebugger",
+    "-style",
+    "-stylesheet",
+    "-session",
+    "-display",
+    "-geometry",
+    "-title",
+    "-qwindowgeometry",
+    "-qwindowicon",
+    "-qwindowtitle",
+}
+
+
+def split_urls(args):
+    """
+    Separate the URLs (and file paths) to open from the options meant for Qt.
+    """
+    urls = []
+    qt_args = []
+    takes_value = False
+    for arg in args:
+        if takes_value:
+            qt_args.append(arg)
+            takes_value = False
+        elif arg.startswith("-"):
+            qt_args.append(arg)
+            takes_value = arg.replace("--", "-", 1) in QT_VALUE_OPTIONS
+        else:
+            urls.append(QUrl.fromUserInput(arg, os.getcwd()).toString())
+    return urls, qt_args
 
-    def calculate_layout_position_for_browser(self, index):
-        return 2 * index
 
-    def dragLeaveEvent(self, event):
-        self.insertion_line.hide()
-        event.accept()
+def read_url_file(file_path):
+    if file_path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(file_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            urls.append(QUrl.fromUserInput(line, os.getcwd()).toString())
+    return urls
 
 
 def main():
-    app = QApplication(sys.argv)
+    args, qt_args = parse_arguments(sys.argv)
+    if args.measure_startup:
+        startup.start(STARTED_AT, args.measure_startup)
+    startup.mark("main")
+    settings.override("memory/budget_mb", args.memory_budget)
+    if args.no_freeze:
+        settings.override("lifecycle/freeze_offscreen", False)
+    if args.pane_stats:
+        settings.override("lifecycle/report_pane_states", True)
+    settings.override("wallpaper/path", args.wallpaper)
+    # Startup is measured with the same single pane every run
+    if args.no_session or args.measure_startup:
+        settings.override("session/enabled", False)
+    if args.no_history:
+        settings.override("history/enabled", False)
+    if args.preload:
+        settings.override("preload/enabled", True)
+    if args.no_find:
+        settings.override("find/enabled", False)
+    settings.override("loads/max_concurrent", args.max_loads)
+    if args.load_stats:
+        settings.override("diagnostics/load_stats", True)
+    if args.filter_list:
+        settings.override("filters/lists", os.pathsep.join(args.filter_list))
+    settings.override("profile/cache_mode", args.cache_mode)
+    settings.override("profile/cache_size_mb", args.cache_size)
+    settings.override("profile/cache_path", args.cache_dir)
+    settings.override("profile/cache_report", args.cache_report)
+    settings.override("engine/process_model", args.process_model)
+    settings.override("engine/renderer_process_limit", args.renderer_limit)
+    settings.override("engine/renderer_report", args.renderer_report)
+    settings.override("metrics/log_path", args.metrics_log)
+    if args.drag_stats:
+        settings.override("diagnostics/drag_stats", True)
+    settings.override("resize/mode", args.resize_mode)
+    settings.override("resize/max_fps", args.resize_fps)
+    if args.diagnose:
+        settings.override("diagnostics/watchdog", True)
+        settings.override("diagnostics/layout_counts", True)
+    settings.override("diagnostics/stall_ms", args.stall_ms)
+    if args.profile:
+        settings.override("diagnostics/profile", True)
+    if args.render_format:
+        settings.override(
+            "render/formats", "pdf,png" if args.render_format == "both" else args.render_format
+        )
+    settings.override("render/pool_size", args.render_pool)
+    settings.override("render/timeout_ms", args.render_timeout)
+    if args.render:
+        # Batch rendering needs no screen and no running instance
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        settings.override("instance/single", False)
+    if args.new_instance or args.measure_startup:
+        settings.override("instance/single", False)
+
+    # Hand the URLs to a running instance, before paying for Qt's and
+    # Chromium's startup
+    if settings.value("instance/single") and forward(
+        args.urls, settings.value("instance/timeout_ms")
+    ):
+        return
+    apply_process_model()
+
+    # Lets QtWebEngine be imported after the QApplication exists
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
+    app = QApplication(sys.argv[:1] + qt_args)
+    app.setOrganizationName("Cinemint")
+    app.setApplicationName("Fasemo")
 
     # Load the custom font
-    font_id = QFontDatabase.addApplicationFont(
-        path.join("resources", "Helvetica-Bold.ttf")
-    )
+    font_id = assets.load_font("Helvetica-Bold.ttf")
     if font_id != -1:
         families = QFontDatabase.applicationFontFamilies(font_id)
         if families:
@@ -634,8 +1722,27 @@ def main():
 
     app.setStyleSheet(stylesheet)
 
-    window = Fasemo()
+    if args.render:
+        from render import render_batch
+
+        sys.exit(
+            render_batch(
+                args.urls,
+                args.render,
+                settings.value("render/formats").split(","),
+                settings.value("render/pool_size"),
+                settings.value("render/timeout_ms"),
+                settings.value("render/width"),
+            )
+        )
+
+    startup.mark("app_created")
+    window = Fasemo(initial_urls=args.urls or None)
+    if settings.value("instance/single"):
+        window.instance_server = InstanceServer(window.open_forwarded_urls, window)
+        window.instance_server.listen()
     window.show()
+    startup.mark("window_shown")
     sys.exit(app.exec())
 
 
@@ -5,7 +5,7 @@ a = Analysis(
     ['fasemo.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('resources/ui.pack', 'resources')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
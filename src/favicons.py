@@ -0,0 +1,136 @@
+"""
+Favicon cache keyed by host.
+
+Icons are kept in a small in-memory LRU and mirrored to PNG files in the
+cache directory, so a pane's toolbar button can show the right icon for
+a site before the page has loaded. The disk store is capped in size and
+evicts the least recently used files first.
+"""
+import os
+from collections import OrderedDict
+from hashlib import sha1
+from os import path
+from PyQt6.QtCore import QSize, QStandardPaths
+from PyQt6.QtGui import QIcon, QPixmap
+from assets import assets
+
+ICON_SIZE = QSize(64, 64)
+
+
+class FaviconCache:
+    def __init__(self, directory, memory_entries, disk_limit_kb):
+        if not directory:
+            directory = path.join(
+                QStandardPaths.writableLocation(
+                    QStandardPaths.StandardLocation.CacheLocation
+                ),
+                "favicons",
+            )
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.disk_limit = disk_limit_kb * 1024
+
+        self.memory = OrderedDict()  # host -> QIcon
+        self.icon_urls = {}  # host -> icon URL last written to disk
+        self.disk_entries = None  # file name -> size, oldest first
+        self.disk_total = 0
+
+    def fallback_icon(self):
+        """
+        Icon for sites that provide none. Decoded once per process.
+        """
+        return assets.icon("btn-default-favicon.png")
+
+    def file_for(self, host):
+        return sha1(host.encode("utf-8")).hexdigest() + ".png"
+
+    def load_disk_index(self):
+        if self.disk_entries is not None:
+            return
+        entries = []
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".png"):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, entry.name, stat.st_size))
+        except OSError:
+            pass
+        entries.sort()
+        self.disk_entries = OrderedDict((name, size) for _, name, size in entries)
+        self.disk_total = sum(self.disk_entries.values())
+
+    def remember(self, host, icon):
+        self.memory[host] = icon
+        self.memory.move_to_end(host)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, host):
+        """
+        Return the cached QIcon for host, or None.
+        """
+        if not host:
+            return None
+        icon = self.memory.get(host)
+        if icon is not None:
+            self.memory.move_to_end(host)
+            return icon
+
+        self.load_disk_index()
+        name = self.file_for(host)
+        if name not in self.disk_entries:
+            return None
+        file_path = path.join(self.directory, name)
+        pixmap = QPixmap(file_path)
+        if pixmap.isNull():
+            self.drop_file(name)
+            return None
+
+        # Keep the on-disk recency in step with use
+        self.disk_entries.move_to_end(name)
+        try:
+            os.utime(file_path)
+        except OSError:
+            pass
+        icon = QIcon(pixmap)
+        self.remember(host, icon)
+        return icon
+
+    def put(self, host, icon, icon_url=""):
+        """
+        Store icon for host. The disk copy is only rewritten when the
+        page's icon URL differs from the one already stored.
+        """
+        if not host or icon.isNull():
+            return
+        self.remember(host, icon)
+        if icon_url and self.icon_urls.get(host) == icon_url:
+            return
+        self.icon_urls[host] = icon_url
+
+        self.load_disk_index()
+        name = self.file_for(host)
+        file_path = path.join(self.directory, name)
+        temp_path = file_path + ".tmp"
+        if not icon.pixmap(ICON_SIZE).save(temp_path, "PNG"):
+            return
+        try:
+            os.replace(temp_path, file_path)
+            size = os.path.getsize(file_path)
+        except OSError:
+            return
+
+        self.disk_total += size - self.disk_entries.pop(name, 0)
+        self.disk_entries[name] = size
+        while self.disk_total > self.disk_limit and len(self.disk_entries) > 1:
+            oldest = next(iter(self.disk_entries))
+            self.drop_file(oldest)
+
+    def drop_file(self, name):
+        self.disk_total -= self.disk_entries.pop(name, 0)
+        try:
+            os.remove(path.join(self.directory, name))
+        except OSError:
+            pass
@@ -0,0 +1,436 @@
+"""
+Filter engine for blocking ad and tracker requests.
+
+Rule lists in the EasyList (Adblock Plus) format are compiled into:
+
+- sets of host names, for plain "||example.com^" rules, looked up by
+  walking the request host's parent domains;
+- buckets of pattern rules keyed by one token (a run of letters, digits
+  and "%") that every URL the rule can match must contain. A request only
+  tries the rules filed under tokens that occur in its URL, so the cost of
+  a decision depends on the URL, not on the size of the lists;
+- a short list of rules that have no usable token (mostly regex rules),
+  screened with a single regex that joins all of their patterns.
+
+Blocking rules are checked first and "@@" exception rules only for requests
+that would be blocked. Element hiding and scriptlet rules are ignored, as
+are network rules with options this engine can't honour ($redirect, $csp,
+...), so that nothing is blocked more widely than the list intends.
+
+Compiled engines are pickled to the cache directory, keyed by the path,
+size and modification time of every list, and reused on the next start.
+Patterns are compiled to regular expressions lazily, on first use.
+"""
+import os
+import pickle
+import re
+from functools import lru_cache
+from hashlib import sha1
+from os import path
+from PyQt6.QtCore import QStandardPaths
+
+CACHE_VERSION = 1
+# Compiled engines are cached as <list_fingerprint()>.pickle; nothing else in
+# the cache directory is touched, as it may be shared
+CACHE_FILE = re.compile(r"[0-9a-f]{40}\.pickle")
+
+TOKEN = re.compile(r"[a-z0-9%]+")
+HOST = re.compile(r"[a-z][a-z0-9+\-.]*://(?:[^@/?#]*@)?(\[[^\]]*\]|[^:/?#]*)")
+# Tokens found in too many URLs to narrow anything down
+COMMON_TOKENS = {"http", "https", "www", "com", "net", "org", "js", "html", "php", "css"}
+
+TYPES = {
+    "document": 1 << 0,
+    "subdocument": 1 << 1,
+    "stylesheet": 1 << 2,
+    "script": 1 << 3,
+    "image": 1 << 4,
+    "font": 1 << 5,
+    "media": 1 << 6,
+    "object": 1 << 7,
+    "xmlhttprequest": 1 << 8,
+    "ping": 1 << 9,
+    "websocket": 1 << 10,
+    "other": 1 << 11,
+}
+TYPE_ALIASES = {
+    "xhr": "xmlhttprequest",
+    "frame": "subdocument",
+    "css": "stylesheet",
+    "beacon": "ping",
+    "object-subrequest": "object",
+}
+ALL_TYPES = sum(TYPES.values())
+# Rules without type options don't apply to top-level documents
+DEFAULT_TYPES = ALL_TYPES & ~TYPES["document"]
+
+# Second-level labels under which sites register their own names
+# (example.co.uk). Stands in for the public suffix list.
+SHARED_SECOND_LEVEL = {"co", "com", "org", "net", "gov", "ac", "edu", "ne", "or"}
+
+
+def url_host(url):
+    found = HOST.match(url)
+    return found.group(1) if found else ""
+
+
+@lru_cache(maxsize=4096)
+def base_domain(host):
+    labels = host.split(".")
+    if (
+        len(labels) > 2
+        and len(labels[-1]) == 2
+        and labels[-2] in SHARED_SECOND_LEVEL
+    ):
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def host_matches(host, domains):
+    """
+    True if host or one of its parent domains is in domains.
+    """
+    while True:
+        if host in domains:
+            return True
+        dot = host.find(".")
+        if dot < 0:
+            return False
+        host = host[dot + 1:]
+
+
+def pattern_regex(pattern, start, end):
+    """
+    Translate a filter pattern (without its anchors) to a regex.
+    start is "||", "|" or "" and end is "|" or "".
+    """
+    parts = []
+    for char in pattern:
+        if char == "*":
+            parts.append(".*")
+        elif char == "^":
+            parts.append(r"(?:[^\w\-.%]|$)")
+        else:
+            parts.append(re.escape(char))
+    source = "".join(parts)
+    if start == "||":
+        source = r"^[a-z][a-z0-9+\-.]*://(?:[^/?#]*\.)?" + source
+    elif start == "|":
+        source = "^" + source
+    if end == "|":
+        source += "$"
+    return source
+
+
+def pattern_tokens(pattern, start, end):
+    """
+    Tokens that every URL matching the pattern contains as whole tokens.
+    """
+    tokens = []
+    for found in TOKEN.finditer(pattern):
+        s, e = found.span()
+        if s == 0 and not start:
+            continue
+        if s > 0 and pattern[s - 1] == "*":
+            continue
+        if e == len(pattern) and not end:
+            continue
+        if e < len(pattern) and pattern[e] == "*":
+            continue
+        tokens.append(found.group())
+    return tokens
+
+
+class Rule:
+    __slots__ = (
+        "text",
+        "source",
+        "regex",
+        "types",
+        "third_party",
+        "domains",
+        "excluded_domains",
+        "match_case",
+    )
+
+    def __init__(self, text, source):
+        self.text = text
+        self.source = source
+        self.regex = None
+        self.types = DEFAULT_TYPES
+        self.third_party = None  # None = either, True/False = only that
+        self.domains = None  # first-party domains the rule is limited to
+        self.excluded_domains = None
+        self.match_case = False
+
+    def __getstate__(self):
+        # Compiled regexes are not kept in the cache
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != "regex"}
+
+    def __setstate__(self, state):
+        self.regex = None
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def matches(self, request):
+        url, lower_url, first_party, third_party, type_bit = request
+        if not self.types & type_bit:
+            return False
+        if self.third_party is not None and self.third_party != third_party:
+            return False
+        if self.domains is not None and not host_matches(first_party, self.domains):
+            return False
+        if self.excluded_domains is not None and host_matches(
+            first_party, self.excluded_domains
+        ):
+            return False
+        if self.regex is None:
+            self.regex = re.compile(self.source)
+        return self.regex.search(url if self.match_case else lower_url) is not None
+
+
+class RuleSet:
+    def __init__(self):
+        self.hosts = set()
+        self.tokens = {}  # token -> [Rule]
+        self.untokenized = []
+        # One regex for all untokenized rules, built on first use
+        self.screen = None
+
+    def __getstate__(self):
+        return dict(self.__dict__, screen=None)
+
+    def __len__(self):
+        return len(self.hosts) + sum(map(len, self.tokens.values())) + len(self.untokenized)
+
+    def add(self, rule, candidates=()):
+        """
+        File rule under the least used of its candidate tokens, so that
+        no bucket grows much larger than the others.
+        """
+        if not candidates:
+            self.untokenized.append(rule)
+            return
+        token = min(
+            candidates,
+            key=lambda t: (t in COMMON_TOKENS, len(self.tokens.get(t, ())), -len(t)),
+        )
+        self.tokens.setdefault(token, []).append(rule)
+
+    def matches(self, request, host, url_tokens):
+        if self.hosts and host_matches(host, self.hosts):
+            return True
+        tokens = self.tokens
+        for token in url_tokens:
+            bucket = tokens.get(token)
+            if bucket is not None:
+                for rule in bucket:
+                    if rule.matches(request):
+                        return True
+        if not self.untokenized:
+            return False
+        if self.screen is None:
+            self.screen = re.compile(
+                "|".join(f"(?:{rule.source})" for rule in self.untokenized),
+                re.IGNORECASE,
+            )
+        if self.screen.search(request[0]) is None:
+            return False
+        for rule in self.untokenized:
+            if rule.matches(request):
+                return True
+        return False
+
+
+class FilterEngine:
+    def __init__(self):
+        self.block = RuleSet()
+        self.allow = RuleSet()
+        self.skipped = 0
+
+    def __len__(self):
+        return len(self.block) + len(self.allow)
+
+    def add_list(self, lines):
+        for line in lines:
+            self.add_rule(line)
+
+    def add_rule(self, line):
+        """
+        Compile one line of a filter list. Returns False for lines that
+        are not network rules or that use unsupported options.
+        """
+        line = line.strip()
+        if not line or line[0] in "![" or "##" in line or "#@#" in line or "#?#" in line or "#$#" in line:
+            return False
+
+        rule_set = self.block
+        if line.startswith("@@"):
+            rule_set = self.allow
+            line = line[2:]
+
+        options = ""
+        dollar = line.rfind("$")
+        if dollar >= 0 and not (line.startswith("/") and line.endswith("/")):
+            line, options = line[:dollar], line[dollar + 1:]
+
+        # /regex/ rules
+        if len(line) > 2 and line.startswith("/") and line.endswith("/"):
+            rule = Rule(line, line[1:-1])
+            if not self.apply_options(rule, options):
+                self.skipped += 1
+                return False
+            try:
+                re.compile(rule.source)
+            except re.error:
+                self.skipped += 1
+                return False
+            rule_set.add(rule)
+            return True
+
+        start = end = ""
+        pattern = line
+        if pattern.startswith("||"):
+            start, pattern = "||", pattern[2:]
+        elif pattern.startswith("|"):
+            start, pattern = "|", pattern[1:]
+        if pattern.endswith("|"):
+            end, pattern = "|", pattern[:-1]
+        # Leading and trailing wildcards change nothing
+        pattern = pattern.strip("*") if not (start or end) else pattern
+
+        rule = Rule(line, "")
+        if not self.apply_options(rule, options):
+            self.skipped += 1
+            return False
+        if not rule.match_case:
+            pattern = pattern.lower()
+
+        plain_host = (
+            start == "||"
+            and not end
+            and pattern.endswith("^")
+            and re.fullmatch(r"[a-z0-9.\-]+", pattern[:-1] or "!") is not None
+        )
+        if plain_host and options == "":
+            rule_set.hosts.add(pattern[:-1])
+            return True
+
+        rule.source = pattern_regex(pattern, start, end)
+        rule_set.add(rule, pattern_tokens(pattern.lower(), start, end))
+        return True
+
+    def apply_options(self, rule, options):
+        if not options:
+            return True
+        included = 0
+        excluded = 0
+        for option in options.split(","):
+            option = option.strip()
+            negated = option.startswith("~")
+            name = option.lstrip("~")
+            name = TYPE_ALIASES.get(name, name)
+            if name in TYPES:
+                if negated:
+                    excluded |= TYPES[name]
+                else:
+                    included |= TYPES[name]
+            elif name == "third-party" or name == "3p":
+                rule.third_party = not negated
+            elif name == "first-party" or name == "1p":
+                rule.third_party = negated
+            elif name == "match-case":
+                rule.match_case = True
+            elif option.startswith("domain="):
+                for domain in option[7:].lower().split("|"):
+                    if domain.startswith("~"):
+                        rule.excluded_domains = (rule.excluded_domains or set()) | {domain[1:]}
+                    elif domain:
+                        rule.domains = (rule.domains or set()) | {domain}
+            elif name in ("popup", "generichide", "elemhide", "genericblock"):
+                # Not about subresource requests
+                return False
+            else:
+                return False
+        if included:
+            rule.types = included
+        if excluded:
+            rule.types = (rule.types if included else ALL_TYPES) & ~excluded
+        return True
+
+    def match(self, url, first_party_host="", resource_type="other"):
+        """
+        Return True if a request for url, made by a page on first_party_host,
+        should be blocked.
+        """
+        lower_url = url.lower()
+        host = url_host(lower_url)
+        first_party = first_party_host.lower()
+        third_party = bool(first_party) and base_domain(host) != base_domain(first_party)
+        request = (url, lower_url, first_party, third_party, TYPES.get(resource_type, TYPES["other"]))
+        url_tokens = set(TOKEN.findall(lower_url))
+        if not self.block.matches(request, host, url_tokens):
+            return False
+        return not self.allow.matches(request, host, url_tokens)
+
+
+def list_fingerprint(list_paths):
+    digest = sha1(str(CACHE_VERSION).encode())
+    for list_path in list_paths:
+        stat = os.stat(list_path)
+        digest.update(
+            f"{path.abspath(list_path)}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode()
+        )
+    return digest.hexdigest()
+
+
+def compile_lists(list_paths):
+    engine = FilterEngine()
+    for list_path in list_paths:
+        with open(list_path, encoding="utf-8", errors="replace") as f:
+            engine.add_list(f)
+    return engine
+
+
+def load_filters(list_paths, cache_dir=""):
+    """
+    Return a FilterEngine for the given rule list files, from the cache
+    directory if the lists haven't changed since they were last compiled.
+    Returns None if no list could be read.
+    """
+    list_paths = [p for p in list_paths if path.isfile(p)]
+    if not list_paths:
+        return None
+    if not cache_dir:
+        cache_dir = path.join(
+            QStandardPaths.writableLocation(
+                QStandardPaths.StandardLocation.CacheLocation
+            ),
+            "filters",
+        )
+
+    cache_path = path.join(cache_dir, list_fingerprint(list_paths) + ".pickle")
+    try:
+        with open(cache_path, "rb") as f:
+            engine = pickle.load(f)
+        if isinstance(engine, FilterEngine):
+            return engine
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError):
+        pass
+
+    try:
+        engine = compile_lists(list_paths)
+    except OSError:
+        return None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in os.listdir(cache_dir):
+            if CACHE_FILE.fullmatch(name):
+                os.remove(path.join(cache_dir, name))
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, "wb") as f:
+            pickle.dump(engine, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        pass
+    return engine
@@ -0,0 +1,345 @@
+"""
+Browsing history and URL-bar completions.
+
+Visits are stored in an SQLite database with two indexes for lookups: one
+on the URL without its scheme and "www." (for prefix completion as the
+user types) and an FTS5 index over URLs and titles (for matching words
+anywhere in them).
+
+Entries are ranked by frecency. Every visit adds a weight that halves every
+HALF_LIFE_DAYS, and the sum is stored as a logarithm, so rankings never need
+to be recomputed as time passes:
+
+    score = log(sum(exp(DECAY * visit_time)))
+
+Writes are queued and applied by a background thread in batches, each in a
+single transaction. Completions are read on the UI thread from a separate
+connection; the database is in WAL mode, so reads never wait for writes.
+"""
+import math
+import queue
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from os import makedirs, path
+from PyQt6.QtCore import QStandardPaths
+
+HALF_LIFE_DAYS = 30
+DECAY = math.log(2) / (HALF_LIFE_DAYS * 86400)
+
+# Prefix matches are looked for among this many of the highest ranked
+# entries first, which answers short prefixes without walking a large
+# part of the URL index
+HOT_ROWS = 3000
+# Full-text matches are ranked directly when there are at most this many
+MATCH_ROWS = 1000
+# More matches than that are looked for among this many of the highest
+# ranked entries first
+WALK_ROWS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    stripped TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    visits INTEGER NOT NULL DEFAULT 0,
+    last_visit REAL NOT NULL DEFAULT 0,
+    score REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS places_stripped ON places(stripped, score);
+CREATE INDEX IF NOT EXISTS places_rank ON places(score DESC, stripped);
+CREATE VIRTUAL TABLE IF NOT EXISTS places_fts USING fts5(
+    url, title, content='places', content_rowid='id', prefix='1 2 3 4 5 6'
+);
+CREATE TRIGGER IF NOT EXISTS places_insert AFTER INSERT ON places BEGIN
+    INSERT INTO places_fts(rowid, url, title) VALUES (new.id, new.url, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS places_delete AFTER DELETE ON places BEGIN
+    INSERT INTO places_fts(places_fts, rowid, url, title)
+        VALUES ('delete', old.id, old.url, old.title);
+END;
+CREATE TRIGGER IF NOT EXISTS places_title AFTER UPDATE OF title ON places BEGIN
+    INSERT INTO places_fts(places_fts, rowid, url, title)
+        VALUES ('delete', old.id, old.url, old.title);
+    INSERT INTO places_fts(rowid, url, title) VALUES (new.id, new.url, new.title);
+END;
+"""
+
+VISIT_SQL = """
+INSERT INTO places(url, stripped, visits, last_visit, score)
+VALUES (?, ?, 1, ?, ?)
+ON CONFLICT(url) DO UPDATE SET
+    visits = visits + 1,
+    last_visit = excluded.last_visit,
+    score = frecency_add(score, excluded.score)
+"""
+
+TITLE_SQL = "UPDATE places SET title = ? WHERE url = ? AND title != ?"
+
+
+def strip_url(url):
+    """
+    Lower-case url without its scheme and a leading "www.".
+    """
+    url = url.lower()
+    for scheme in ("https://", "http://"):
+        if url.startswith(scheme):
+            url = url[len(scheme):]
+            break
+    if url.startswith("www."):
+        url = url[4:]
+    return url
+
+
+def fold(text):
+    """
+    Lower-case text without diacritics, as the FTS tokenizer sees it.
+    """
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", text.lower()) if not unicodedata.combining(c)
+    )
+
+
+def visit_score(visit_time):
+    return DECAY * visit_time
+
+
+def frecency_add(score, other):
+    """
+    log(exp(score) + exp(other)) without overflowing.
+    """
+    high, low = max(score, other), min(score, other)
+    return high + math.log1p(math.exp(low - high))
+
+
+def recordable(url):
+    return url.startswith("http://") or url.startswith("https://")
+
+
+class HistoryStore:
+    def __init__(self, file_path="", batch_ms=1000):
+        if not file_path:
+            file_path = path.join(
+                QStandardPaths.writableLocation(
+                    QStandardPaths.StandardLocation.AppDataLocation
+                ),
+                "history.sqlite",
+            )
+        if file_path == ":memory:":
+            # The writer thread's connection would open a database of its own
+            raise ValueError("HistoryStore needs a database file")
+        if path.dirname(file_path):
+            makedirs(path.dirname(file_path), exist_ok=True)
+        self.file_path = file_path
+        self.batch_seconds = batch_ms / 1000
+
+        self.db = self.connect()
+        self.db.executescript(SCHEMA)
+        self.db.commit()
+
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.thread = threading.Thread(target=self.write_loop, daemon=True)
+        self.thread.start()
+
+    def connect(self):
+        db = sqlite3.connect(self.file_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.create_function("frecency_add", 2, frecency_add, deterministic=True)
+        return db
+
+    # -------- Writes (queued) --------
+    def record_visit(self, url, visit_time=None):
+        if not recordable(url):
+            return
+        if visit_time is None:
+            visit_time = time.time()
+        self.queue.put(
+            (VISIT_SQL, (url, strip_url(url), visit_time, visit_score(visit_time)))
+        )
+
+    def record_title(self, url, title):
+        if not recordable(url) or not title:
+            return
+        self.queue.put((TITLE_SQL, (title, url, title)))
+
+    def flush(self):
+        """
+        Block until every queued write has been committed.
+        """
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.db.close()
+
+    def write_loop(self):
+        db = self.connect()
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            # Collect whatever arrives within the batch window
+            deadline = time.monotonic() + self.batch_seconds
+            while batch[-1] is not None and not isinstance(batch[-1], threading.Event):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            statements = [item for item in batch if isinstance(item, tuple)]
+            if statements:
+                try:
+                    with db:
+                        for sql, parameters in statements:
+                            db.execute(sql, parameters)
+                    self.batches += 1
+                except sqlite3.Error:
+                    pass
+            for item in batch:
+                if item is None:
+                    running = False
+                elif isinstance(item, threading.Event):
+                    item.set()
+        db.close()
+
+    def import_entries(self, entries):
+        """
+        Insert (url, title, visits, last_visit) rows directly, in one
+        transaction on the calling thread. Meant for imports and benchmarks.
+        """
+        rows = []
+        for url, title, visits, last_visit in entries:
+            # Spread the visits over the month before the last one
+            score = visit_score(last_visit)
+            for i in range(1, visits):
+                score = frecency_add(score, visit_score(last_visit - i * 86400 * 30 / visits))
+            rows.append((url, strip_url(url), title, visits, last_visit, score))
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO places(url, stripped, title, visits, last_visit, score) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    # -------- Reads --------
+    def count(self):
+        return self.db.execute("SELECT count(*) FROM places").fetchone()[0]
+
+    def prefix_matches(self, text, limit=8):
+        """
+        Return up to limit (url, title, visits) for entries whose URL starts
+        with text (ignoring the scheme and "www."), best first.
+        """
+        key = strip_url(text.strip())
+        if not key:
+            return []
+        upper = key + "\uffff"
+
+        found = {}
+        rows = self.db.execute(
+            "SELECT url, title, visits FROM places WHERE id IN ("
+            "  SELECT id FROM (SELECT id, stripped FROM places ORDER BY score DESC LIMIT ?)"
+            "  WHERE stripped >= ? AND stripped < ?"
+            ") ORDER BY score DESC LIMIT ?",
+            (HOT_ROWS, key, upper, limit),
+        ).fetchall()
+        for url, title, visits in rows:
+            found[url] = (title, visits)
+
+        if len(found) < limit:
+            # Every entry under the prefix is ranked, so the best ones are
+            # found however many there are
+            rows = self.db.execute(
+                "SELECT url, title, visits FROM places"
+                " WHERE stripped >= ? AND stripped < ?"
+                " ORDER BY score DESC LIMIT ?",
+                (key, upper, limit),
+            ).fetchall()
+            for url, title, visits in rows:
+                found.setdefault(url, (title, visits))
+
+        return [(url, title, visits) for url, (title, visits) in found.items()][:limit]
+
+    def complete(self, text, limit=8):
+        """
+        Return up to limit (url, title) pairs for what was typed into the URL
+        bar, best first: URLs starting with the text, then entries whose URL
+        or title contain all of its words.
+        """
+        text = text.strip()
+        if not text:
+            return []
+        found = {
+            url: title for url, title, _ in self.prefix_matches(text, limit)
+        }
+
+        words = re.findall(r"\w+", text.lower())
+        if len(found) < limit and words:
+            # Words followed by more input are complete, only the last one
+            # is still being typed
+            match = " ".join(f'"{word}"' for word in words[:-1])
+            match += f' "{words[-1]}"*'
+            for url, title in self.fulltext_matches(match, limit):
+                if len(found) >= limit:
+                    break
+                found.setdefault(url, title)
+
+        return list(found.items())[:limit]
+
+    def fulltext_matches(self, match, limit):
+        """
+        Return up to limit (url, title) for the entries matching the FTS
+        query match, best first. Every match is ranked, however many there
+        are; the index alone returns them in rowid order.
+        """
+        ids = [
+            rowid
+            for (rowid,) in self.db.execute(
+                "SELECT rowid FROM places_fts WHERE places_fts MATCH ? LIMIT ?",
+                (match, MATCH_ROWS + 1),
+            )
+        ]
+        if len(ids) <= MATCH_ROWS:
+            return self.db.execute(
+                "SELECT url, title FROM places WHERE id IN (%s) ORDER BY score DESC LIMIT ?"
+                % ",".join("?" * len(ids)),
+                (*ids, limit),
+            ).fetchall()
+
+        # Common words: the best entries are usually among the highest
+        # ranked ones. Walking down the ranking, rows that cannot match
+        # are skipped with a cheap substring test and the rest confirmed
+        # by the index. The matches found this way are the best ones, but
+        # the walk only proves that once it found limit of them.
+        pieces = [fold(piece) for piece in re.findall(r"[^\W_]+", match)]
+        rows = []
+        ranked = self.db.execute(
+            "SELECT id, url, title FROM places ORDER BY score DESC LIMIT ?", (WALK_ROWS,)
+        )
+        for rowid, url, title in ranked:
+            text = fold(url + " " + title)
+            if not all(piece in text for piece in pieces):
+                continue
+            if self.db.execute(
+                "SELECT 1 FROM places_fts WHERE places_fts MATCH ? AND rowid = ?",
+                (match, rowid),
+            ).fetchone():
+                rows.append((url, title))
+                if len(rows) == limit:
+                    return rows
+        return self.db.execute(
+            "SELECT url, title FROM places WHERE id IN ("
+            "  SELECT rowid FROM places_fts WHERE places_fts MATCH ?"
+            ") ORDER BY score DESC LIMIT ?",
+            (match, limit),
+        ).fetchall()
@@ -0,0 +1,128 @@
+"""
+Single-instance operation.
+
+The first Fasemo process listens on a local socket (a Unix domain socket,
+or a named pipe on Windows) named after the user and the profile. A later
+launch connects to it before creating its QApplication or importing
+QtWebEngine, sends its URLs as one JSON line and exits once the running
+instance has acknowledged them:
+
+    {"urls": ["https://example.com/", ...]}
+    ok
+
+The running instance opens the URLs in new panes and raises its window.
+An instance that is busy (a long session restore) may not acknowledge in
+time; the URLs are then still waiting in its socket and the later launch
+exits all the same, so there is never a second browser process.
+"""
+import getpass
+import json
+import sys
+from hashlib import sha1
+from PyQt6.QtCore import QObject
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+from settings import settings
+
+
+def server_name():
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = ""
+    key = "\0".join(
+        [user, settings.value("profile/name"), settings.value("profile/storage_path")]
+    )
+    return "fasemo-" + sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def instance_running(name):
+    """
+    Whether an instance is listening on name. Connecting works even while
+    its UI thread is busy.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(name)
+    if not socket.waitForConnected(500):
+        return False
+    socket.disconnectFromServer()
+    return True
+
+
+def forward(urls, timeout_ms=3000):
+    """
+    Hand urls to a running instance. Returns True if one took them, or is
+    alive and has them queued, False if there is no running instance.
+    Works without a QCoreApplication.
+    """
+    socket = QLocalSocket()
+    socket.connectToServer(server_name())
+    if not socket.waitForConnected(min(timeout_ms, 500)):
+        return False
+    socket.write((json.dumps({"urls": urls}) + "\n").encode("utf-8"))
+    socket.flush()
+    if not socket.waitForBytesWritten(timeout_ms) and socket.bytesToWrite():
+        socket.abort()
+        return False
+    answered = socket.waitForReadyRead(timeout_ms) and socket.readLine().data().strip() == b"ok"
+    if not answered:
+        print(
+            "fasemo: the running instance is busy; it will open the URLs when it catches up",
+            file=sys.stderr,
+        )
+    socket.disconnectFromServer()
+    return True
+
+
+class InstanceServer(QObject):
+    def __init__(self, on_urls, parent=None):
+        super().__init__(parent)
+        # Called with the list of URLs of every later launch
+        self.on_urls = on_urls
+        self.buffers = {}  # QLocalSocket -> bytes received so far
+
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.on_new_connection)
+
+    def listen(self):
+        """
+        Start listening. Returns False if another instance already is.
+        """
+        name = server_name()
+        # With UserAccessOption, listen() replaces the socket of a running
+        # instance instead of failing, so ask first
+        if instance_running(name):
+            return False
+        if self.server.listen(name):
+            return True
+        # Left behind by an instance that crashed
+        QLocalServer.removeServer(name)
+        return self.server.listen(name)
+
+    def on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = b""
+            socket.readyRead.connect(lambda socket=socket: self.on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self.on_disconnected(socket))
+
+    def on_ready_read(self, socket):
+        data = self.buffers.get(socket, b"") + socket.readAll().data()
+        if b"\n" not in data:
+            self.buffers[socket] = data
+            return
+        line = data.split(b"\n", 1)[0]
+        self.buffers[socket] = b""
+        try:
+            message = json.loads(line)
+            urls = [url for url in message.get("urls", []) if isinstance(url, str)]
+        except (ValueError, AttributeError):
+            socket.disconnectFromServer()
+            return
+        socket.write(b"ok\n")
+        socket.flush()
+        self.on_urls(urls)
+
+    def on_disconnected(self, socket):
+        self.buffers.pop(socket, None)
+        socket.deleteLater()
@@ -0,0 +1,120 @@
+"""
+Load scheduler for panes.
+
+A pane starts loading when its web view is created. When many panes want
+to load at once (a bulk open from the command line, or a resize that
+brings many placeholders into view), the scheduler lets at most
+loads/max_concurrent of them load at a time and queues the rest, starting
+the queued panes nearest the centre of the viewport first. A load frees its
+slot when the page finishes loading, or after loads/timeout_ms.
+
+Every start is reported with how long the pane waited and how many panes
+were still queued, and a summary is reported when the queue drains:
+
+    {"event": "load_started", "url": "...", "wait_ms": 812.0,
+     "queued": 37, "in_flight": 4}
+    {"event": "load_queue_drained", "loads": 100, "max_queued": 96,
+     "mean_wait_ms": 5120.4, "max_wait_ms": 11234.9}
+
+Panes the user activates load right away and don't take a slot.
+"""
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, QTimer
+
+
+class LoadScheduler(QObject):
+    def __init__(self, window, max_concurrent=4, timeout_ms=30000, report=None, parent=None):
+        super().__init__(parent)
+        self.window = window
+        self.max_concurrent = max_concurrent
+        self.timeout_ms = timeout_ms
+        # Called with a dict for every start and when the queue drains
+        self.report = report
+
+        self.queue = {}  # BrowserContainer -> time it was queued
+        self.in_flight = {}  # BrowserContainer -> time its load started
+        self.dispatch_pending = False
+
+        self.loads = 0
+        self.max_queued = 0
+        self.waits = deque(maxlen=1000)
+
+    def request(self, pane):
+        """
+        Queue a placeholder pane to be loaded.
+        """
+        if pane.browser is not None or pane in self.queue or pane in self.in_flight:
+            return
+        self.queue[pane] = time.monotonic()
+        self.max_queued = max(self.max_queued, len(self.queue))
+        # Panes are often queued in bulk; pick the nearest once they all are
+        if not self.dispatch_pending:
+            self.dispatch_pending = True
+            QTimer.singleShot(0, self.dispatch)
+
+    def loading(self, pane):
+        return pane in self.in_flight
+
+    def forget(self, pane):
+        self.queue.pop(pane, None)
+        if self.in_flight.pop(pane, None) is not None:
+            self.dispatch()
+
+    def has_slot(self):
+        return self.max_concurrent <= 0 or len(self.in_flight) < self.max_concurrent
+
+    def dispatch(self):
+        self.dispatch_pending = False
+        while self.queue and self.has_slot():
+            pane = min(self.queue, key=self.window.viewport_distance)
+            queued_at = self.queue.pop(pane)
+            # Activated by the user in the meantime
+            if pane.browser is not None:
+                continue
+            started = time.monotonic()
+            self.in_flight[pane] = started
+            pane.ensure_browser()
+            pane.browser.loadFinished.connect(lambda ok, pane=pane: self.finished(pane))
+            QTimer.singleShot(
+                self.timeout_ms, lambda pane=pane, started=started: self.timed_out(pane, started)
+            )
+
+            wait_ms = round((started - queued_at) * 1000, 1)
+            self.loads += 1
+            self.waits.append(wait_ms)
+            self.publish(
+                {
+                    "event": "load_started",
+                    "url": pane.url,
+                    "wait_ms": wait_ms,
+                    "queued": len(self.queue),
+                    "in_flight": len(self.in_flight),
+                }
+            )
+
+    def finished(self, pane):
+        if self.in_flight.pop(pane, None) is None:
+            return
+        self.dispatch()
+        # A pane that loaded off screen can be frozen now
+        self.window.schedule_viewport_update()
+        if not self.queue and not self.in_flight:
+            self.publish(self.summary())
+
+    def timed_out(self, pane, started):
+        if self.in_flight.get(pane) == started:
+            self.finished(pane)
+
+    def summary(self):
+        return {
+            "event": "load_queue_drained",
+            "loads": self.loads,
+            "max_queued": self.max_queued,
+            "mean_wait_ms": round(sum(self.waits) / len(self.waits), 1) if self.waits else None,
+            "max_wait_ms": max(self.waits) if self.waits else None,
+        }
+
+    def publish(self, record):
+        if self.report is not None:
+            self.report(record)
@@ -0,0 +1,158 @@
+"""
+Renderer memory accounting and budget enforcement.
+
+The monitor periodically samples the resident set size of every renderer
+process backing a BrowserContainer. When the total goes over the budget,
+the least-recently-focused panes that are not on screen are moved to the
+Discarded lifecycle state until usage is back under budget.
+
+renderer_report() maps every pane to its renderer process for comparing
+Chromium process models.
+"""
+import json
+import os
+from collections import Counter
+from PyQt6.QtCore import QObject, QTimer
+from settings import settings
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    PAGE_SIZE = 4096
+
+
+def process_rss(pid):
+    """
+    Return the resident set size of a process in bytes, or None when it
+    cannot be read (no /proc on this platform, or the process is gone).
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * PAGE_SIZE
+
+
+def process_pss(pid):
+    """
+    Return the proportional set size of a process in bytes (shared pages
+    split between the processes mapping them), or None if unavailable.
+    """
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def renderer_report(panes):
+    """
+    Describe which renderer process backs each pane and what it costs.
+    """
+    entries = []
+    processes = {}
+    for index, bc in enumerate(panes):
+        pid = 0
+        if bc.browser is not None and not bc.is_discarded():
+            pid = bc.browser.page().renderProcessPid()
+        entries.append(
+            {
+                "index": index,
+                "url": bc.current_url().toString(),
+                "state": bc.state(),
+                "pid": pid,
+            }
+        )
+        if pid > 0 and pid not in processes:
+            processes[pid] = {"rss": process_rss(pid), "pss": process_pss(pid)}
+
+    panes_per_pid = Counter(entry["pid"] for entry in entries)
+    for entry in entries:
+        process = processes.get(entry["pid"])
+        if process:
+            entry.update(process)
+            entry["panes_in_process"] = panes_per_pid[entry["pid"]]
+    return {
+        "panes": entries,
+        "pane_count": len(entries),
+        "renderer_count": len(processes),
+        "total_rss": sum(p["rss"] or 0 for p in processes.values()),
+        "total_pss": sum(p["pss"] or 0 for p in processes.values()),
+        "process_model": settings.value("engine/process_model") or "default",
+        "renderer_process_limit": settings.value("engine/renderer_process_limit"),
+    }
+
+
+def write_renderer_report(panes, file_path):
+    line = json.dumps(renderer_report(panes))
+    if file_path == "-":
+        print(line)
+    else:
+        with open(file_path, "a") as f:
+            f.write(line + "\n")
+
+
+class MemoryMonitor(QObject):
+    def __init__(self, window, budget_mb, interval_ms, parent=None):
+        super().__init__(parent)
+        self.window = window
+        self.budget = budget_mb * 1024 * 1024
+        self.last_total = 0
+        self.discard_count = 0
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.sample)
+        if self.budget > 0:
+            self.timer.start()
+
+    def renderer_usage(self):
+        """
+        Group live panes by renderer process.
+        Returns {pid: (rss_bytes or None, [BrowserContainer, ...])}.
+        """
+        panes_by_pid = {}
+        for bc in self.window.browser_containers:
+            if bc.browser is None or bc.is_discarded():
+                continue
+            pid = bc.browser.page().renderProcessPid()
+            if pid > 0:
+                panes_by_pid.setdefault(pid, []).append(bc)
+        return {
+            pid: (process_rss(pid), panes) for pid, panes in panes_by_pid.items()
+        }
+
+    def sample(self):
+        usage = self.renderer_usage()
+        total = sum(rss for rss, _ in usage.values() if rss)
+        self.last_total = total
+        if total <= self.budget:
+            return
+
+        # Several panes can share one renderer, so split each process'
+        # memory evenly across the panes it hosts.
+        costs = {}
+        for rss, panes in usage.values():
+            if rss is None:
+                continue
+            for bc in panes:
+                costs[bc] = rss // len(panes)
+
+        # Panes near the viewport would be thawed (and reloaded) right away
+        visible = set(
+            self.window.visible_browsers(settings.value("lifecycle/freeze_margin_px"))
+        )
+        candidates = sorted(
+            (bc for bc in costs if bc not in visible),
+            key=lambda bc: bc.last_focused,
+        )
+        for bc in candidates:
+            if total <= self.budget:
+                break
+            if bc.discard():
+                total -= costs[bc]
+                self.discard_count += 1
@@ -0,0 +1,359 @@
+"""
+Per-pane performance metrics.
+
+Every pane's loads are recorded: when the navigation started and finished,
+whether it succeeded, how many bytes it transferred and the page's own
+Navigation Timing figures. Renderer crashes and kills are counted too.
+Records are available in-process through MetricsRecorder and can also be
+appended to a JSON-lines log, one object per event:
+
+    {"event": "navigation", "pane": 3, "url": "...", "host": "...",
+     "started": 1760000000.123, "duration_ms": 812.4, "ok": true,
+     "bytes": 183422, "timing": {"ttfb": 120.5, ...}, "blocked": 12,
+     "pane_count": 42, "live_panes": 7}
+    {"event": "renderer_terminated", "pane": 3, "status": "crashed", ...}
+
+Navigations the user commits in a URL bar are also timed from Enter to
+the page's load event and to the first paint of the new page:
+
+    {"event": "commit", "pane": 3, "url": "...", "mode": "prerender",
+     "commit_to_load_ms": 0.0, "commit_to_paint_ms": 16.2}
+
+"mode" says whether the target was prerendered, preconnected or neither
+("plain"), to compare runs with URL-bar preloading on and off.
+"""
+import json
+import time
+from collections import deque
+from itertools import count
+from PyQt6 import sip
+from PyQt6.QtCore import QEvent, QObject, QTimer
+from PyQt6.QtWidgets import QWidget
+
+# A commit record is written without its paint time if the pane doesn't
+# paint the new page within this time
+COMMIT_TIMEOUT_MS = 30000
+
+# Runs in the page after loadFinished. Byte counts only cover same-origin
+# resources and those sent with Timing-Allow-Origin.
+NAVIGATION_TIMING_SCRIPT = """
+(function() {
+    var bytes = 0;
+    performance.getEntriesByType("resource").forEach(function(e) {
+        bytes += e.transferSize || 0;
+    });
+    var nav = performance.getEntriesByType("navigation")[0];
+    if (!nav) {
+        return {bytes: bytes, timing: null};
+    }
+    bytes += nav.transferSize || 0;
+    return {bytes: bytes, timing: {
+        type: nav.type,
+        ttfb: nav.responseStart,
+        dom_interactive: nav.domInteractive,
+        dom_content_loaded: nav.domContentLoadedEventEnd,
+        load_event_end: nav.loadEventEnd,
+        duration: nav.duration,
+        transfer_size: nav.transferSize,
+        resources: performance.getEntriesByType("resource").length
+    }};
+})()
+"""
+
+TERMINATION_STATUS = {
+    0: "normal",
+    1: "abnormal",
+    2: "crashed",
+    3: "killed",
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PaneMetrics:
+    def __init__(self, pane_id, history_size):
+        self.pane_id = pane_id
+        self.navigations = deque(maxlen=history_size)
+        self.current = None
+        self.terminations = 0
+
+    def summary(self):
+        durations = [n["duration_ms"] for n in self.navigations if n["ok"]]
+        return {
+            "pane": self.pane_id,
+            "navigations": len(self.navigations),
+            "failures": sum(1 for n in self.navigations if not n["ok"]),
+            "terminations": self.terminations,
+            "mean_ms": round(sum(durations) / len(durations), 1) if durations else None,
+            "last": self.navigations[-1] if self.navigations else None,
+        }
+
+
+class MetricsRecorder(QObject):
+    def __init__(self, window, log_path="", history_size=50, parent=None):
+        super().__init__(parent)
+        self.window = window
+        self.history_size = history_size
+        self.panes = {}  # BrowserContainer -> PaneMetrics
+        self.ids = count(1)
+        self.recent = deque(maxlen=1000)  # Recent navigations across all panes
+        self.by_host = {}  # host -> {"count", "failures", "total_ms"}
+        self.terminations = 0
+        self.commits = {}  # BrowserContainer -> commit being timed
+        self.paint_sources = {}  # widget -> BrowserContainer it paints for
+        self.recent_commits = deque(maxlen=1000)
+        self.log = open(log_path, "a", buffering=1) if log_path else None
+
+    def attach(self, bc):
+        """
+        Start recording a pane. Called once, when its view is created.
+        """
+        metrics = PaneMetrics(next(self.ids), self.history_size)
+        self.panes[bc] = metrics
+        bc.browser.loadStarted.connect(lambda: self.on_load_started(bc))
+        bc.browser.loadFinished.connect(lambda ok: self.on_load_finished(bc, ok))
+        bc.browser.urlChanged.connect(lambda url: self.on_url_changed(bc))
+        # Connected on the view, so that it outlives page swaps
+        bc.browser.renderProcessTerminated.connect(
+            lambda status, exit_code: self.on_renderer_terminated(bc, status, exit_code)
+        )
+
+    def detach(self, bc):
+        self.panes.pop(bc, None)
+        self.commits.pop(bc, None)
+        self.unwatch_paints(bc)
+
+    def on_load_started(self, bc):
+        metrics = self.panes.get(bc)
+        if metrics is None:
+            return
+        metrics.current = {
+            "started": time.time(),
+            "start_clock": time.monotonic(),
+        }
+
+    def on_load_finished(self, bc, ok):
+        pending = self.commits.get(bc)
+        if pending is not None and pending["record"]["commit_to_load_ms"] is None:
+            pending["record"]["commit_to_load_ms"] = self.since_commit(pending)
+            self.finish_commit(bc)
+
+        metrics = self.panes.get(bc)
+        if metrics is None or metrics.current is None:
+            return
+        current = metrics.current
+        metrics.current = None
+        url = bc.browser.url()
+        record = {
+            "event": "navigation",
+            "pane": metrics.pane_id,
+            "url": url.toString(),
+            "host": url.host(),
+            "started": round(current["started"], 3),
+            "duration_ms": round((time.monotonic() - current["start_clock"]) * 1000, 1),
+            "ok": ok,
+            "bytes": None,
+            "timing": None,
+            "blocked": bc.blocked_requests(),
+            "pane_count": len(self.window.browser_containers),
+            "live_panes": self.window.pane_state_counts()["active"],
+        }
+        metrics.navigations.append(record)
+        self.recent.append(record)
+
+        host = self.by_host.setdefault(
+            record["host"], {"count": 0, "failures": 0, "total_ms": 0.0}
+        )
+        host["count"] += 1
+        if ok:
+            host["total_ms"] += record["duration_ms"]
+        else:
+            host["failures"] += 1
+
+        if ok:
+            # The record is logged once the page's timing data arrives
+            bc.browser.page().runJavaScript(
+                NAVIGATION_TIMING_SCRIPT,
+                0,
+                lambda result: self.on_timing(record, result),
+            )
+        else:
+            self.write(record)
+
+    def on_timing(self, record, result):
+        if isinstance(result, dict):
+            record["bytes"] = result.get("bytes")
+            record["timing"] = result.get("timing")
+        self.write(record)
+
+    def on_renderer_terminated(self, bc, status, exit_code):
+        metrics = self.panes.get(bc)
+        if metrics is None:
+            return
+        metrics.terminations += 1
+        self.terminations += 1
+        self.write(
+            {
+                "event": "renderer_terminated",
+                "pane": metrics.pane_id,
+                "url": bc.browser.url().toString(),
+                "time": round(time.time(), 3),
+                "status": TERMINATION_STATUS.get(
+                    getattr(status, "value", status), str(status)
+                ),
+                "exit_code": exit_code,
+            }
+        )
+
+    # -------- URL-bar commits --------
+    def track_commit(self, bc, url, mode, started, loaded=False):
+        """
+        Time a navigation to url that the user committed at monotonic time
+        started. mode is "prerender", "preconnect" or "plain"; loaded is
+        True if a prerendered page had already finished loading.
+        """
+        metrics = self.panes.get(bc)
+        if metrics is None:
+            return
+        record = {
+            "event": "commit",
+            "pane": metrics.pane_id,
+            "url": url,
+            "mode": mode,
+            "time": round(time.time(), 3),
+            "commit_to_load_ms": None,
+            "commit_to_paint_ms": None,
+        }
+        pending = {
+            "record": record,
+            "started": started,
+            # Paints count once the view shows the new page; a swapped-in
+            # prerender already does
+            "armed": mode == "prerender",
+        }
+        if loaded:
+            record["commit_to_load_ms"] = self.since_commit(pending)
+        self.commits[bc] = pending
+        self.recent_commits.append(record)
+
+        # Chromium may replace the widget that shows the page when the
+        # navigation switches renderer, so watch the view's children too
+        for widget in [bc.browser] + bc.browser.findChildren(QWidget):
+            self.watch_paints(widget, bc)
+        QTimer.singleShot(
+            COMMIT_TIMEOUT_MS, lambda: self.finish_commit(bc, record, force=True)
+        )
+
+    def watch_paints(self, widget, bc):
+        if widget not in self.paint_sources:
+            widget.installEventFilter(self)
+        self.paint_sources[widget] = bc
+
+    def unwatch_paints(self, bc):
+        for widget in [w for w, pane in self.paint_sources.items() if pane is bc]:
+            del self.paint_sources[widget]
+            # Chromium may already have deleted a widget it replaced
+            if not sip.isdeleted(widget):
+                widget.removeEventFilter(self)
+
+    def on_url_changed(self, bc):
+        pending = self.commits.get(bc)
+        if pending is not None:
+            pending["armed"] = True
+
+    def eventFilter(self, source, event):
+        bc = self.paint_sources.get(source)
+        if bc is not None:
+            if event.type() == QEvent.Type.ChildAdded and event.child().isWidgetType():
+                self.watch_paints(event.child(), bc)
+            elif event.type() == QEvent.Type.Paint:
+                pending = self.commits.get(bc)
+                if (
+                    pending is not None
+                    and pending["armed"]
+                    and pending["record"]["commit_to_paint_ms"] is None
+                ):
+                    pending["record"]["commit_to_paint_ms"] = self.since_commit(pending)
+                    self.finish_commit(bc)
+        return False
+
+    def since_commit(self, pending):
+        return round((time.monotonic() - pending["started"]) * 1000, 1)
+
+    def finish_commit(self, bc, record=None, force=False):
+        pending = self.commits.get(bc)
+        if pending is None or (record is not None and pending["record"] is not record):
+            return
+        record = pending["record"]
+        if not force and None in (record["commit_to_load_ms"], record["commit_to_paint_ms"]):
+            return
+        del self.commits[bc]
+        # Paints are only watched while a commit is being timed
+        self.unwatch_paints(bc)
+        self.write(record)
+
+    def write(self, record):
+        if self.log is not None:
+            self.log.write(json.dumps(record) + "\n")
+
+    # -------- In-process API --------
+    def pane_metrics(self, bc):
+        """
+        Summary of one pane's recorded navigations, or None.
+        """
+        metrics = self.panes.get(bc)
+        return metrics.summary() if metrics else None
+
+    def summary(self):
+        """
+        Aggregate figures over recent navigations in all panes.
+        """
+        durations = [r["duration_ms"] for r in self.recent if r["ok"]]
+        return {
+            "navigations": len(self.recent),
+            "failures": sum(1 for r in self.recent if not r["ok"]),
+            "terminations": self.terminations,
+            "commit_to_paint_ms": {
+                mode: percentile(
+                    [
+                        r["commit_to_paint_ms"]
+                        for r in self.recent_commits
+                        if r["mode"] == mode and r["commit_to_paint_ms"] is not None
+                    ],
+                    0.5,
+                )
+                for mode in ("plain", "preconnect", "prerender")
+            },
+            "load_ms": {
+                "mean": round(sum(durations) / len(durations), 1) if durations else None,
+                "p50": percentile(durations, 0.5),
+                "p95": percentile(durations, 0.95),
+            },
+            "slowest_hosts": sorted(
+                (
+                    {
+                        "host": host,
+                        "count": stats["count"],
+                        "failures": stats["failures"],
+                        "mean_ms": round(
+                            stats["total_ms"] / (stats["count"] - stats["failures"]), 1
+                        )
+                        if stats["count"] > stats["failures"]
+                        else None,
+                    }
+                    for host, stats in self.by_host.items()
+                ),
+                key=lambda h: h["mean_ms"] or 0,
+                reverse=True,
+            )[:10],
+        }
+
+    def close(self):
+        if self.log is not None:
+            self.log.close()
+            self.log = None
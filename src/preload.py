@@ -0,0 +1,186 @@
+"""
+Predictive preloading of URL-bar targets.
+
+Once the user has stopped typing in a pane's URL bar for preload/delay_ms,
+the most likely target of the text is guessed:
+
+- an entry from the browsing history that starts with the text, has been
+  visited at least preload/min_visits times and at least twice as often as
+  the next match, or a complete URL with a path, is prerendered: loaded
+  into a hidden page of the shared profile, which the pane adopts in place
+  of its current page if the user commits to the same URL;
+- anything else that looks like an address only gets a preconnect, made
+  through a <link rel="preconnect"> in an otherwise blank page, so that DNS,
+  TCP and TLS are done by the time the user commits.
+
+The work is bounded: there is at most one prerendered page and one
+preconnect page, whichever pane is typing. A prerender is dropped when the
+prediction changes, when its pane commits to something else or closes,
+and preload/ttl_ms after it was started.
+"""
+from collections import Counter
+from html import escape
+from PyQt6.QtCore import QObject, QTimer, QUrl
+from settings import settings
+
+
+def same_target(first, second):
+    strip = QUrl.UrlFormattingOption.StripTrailingSlash
+    return QUrl(first).adjusted(strip) == QUrl(second).adjusted(strip)
+
+
+class Preloader(QObject):
+    def __init__(self, history=None, parent=None):
+        super().__init__(parent)
+        self.history = history
+
+        self.typing_timer = QTimer(self)
+        self.typing_timer.setSingleShot(True)
+        self.typing_timer.setInterval(settings.value("preload/delay_ms"))
+        self.typing_timer.timeout.connect(self.predict_pending)
+        self.pending = None  # (pane, text) waiting for the typing pause
+
+        # The prerender in progress
+        self.page = None
+        self.owner = None
+        self.target = None
+        self.loaded = False
+        self.expiry_timer = QTimer(self)
+        self.expiry_timer.setSingleShot(True)
+        self.expiry_timer.timeout.connect(self.cancel)
+
+        self.connector = None  # Page used for preconnects
+        self.connected_origin = None
+
+        self.stats = Counter()
+
+    # -------- Prediction --------
+    def typed(self, pane, text):
+        self.pending = (pane, text)
+        self.typing_timer.start()
+
+    def predict(self, text):
+        """
+        Return (url, confident) for text typed into a URL bar, or
+        (None, False) if there is no sensible guess.
+        """
+        text = text.strip()
+        if len(text) < 3 or " " in text:
+            return None, False
+
+        if self.history is not None:
+            matches = self.history.prefix_matches(text, 2)
+            if matches:
+                url, _, visits = matches[0]
+                runner_up = matches[1][2] if len(matches) > 1 else 0
+                confident = (
+                    visits >= settings.value("preload/min_visits")
+                    and visits >= 2 * runner_up
+                )
+                return url, confident
+
+        url = QUrl.fromUserInput(text)
+        if not url.isValid() or "." not in url.host():
+            return None, False
+        complete = "://" in text and url.path() not in ("", "/")
+        return url.toString(), complete
+
+    def predict_pending(self):
+        if self.pending is None:
+            return
+        pane, text = self.pending
+        self.pending = None
+        url, confident = self.predict(text)
+        if url is None:
+            return
+        self.stats["predictions"] += 1
+        if confident and settings.value("preload/prerender"):
+            self.prerender(pane, url)
+        else:
+            self.preconnect(url)
+
+    # -------- Warming --------
+    def preconnect(self, url):
+        qurl = QUrl(url)
+        origin = f"{qurl.scheme()}://{qurl.authority()}"
+        if origin == self.connected_origin:
+            return
+        if self.connector is None:
+            from engine import create_page
+
+            self.connector = create_page(self)
+        href = escape(origin, quote=True)
+        self.connector.setHtml(
+            f'<link rel="preconnect" href="{href}">'
+            f'<link rel="dns-prefetch" href="{href}">',
+            QUrl("about:blank"),
+        )
+        self.connected_origin = origin
+        self.stats["preconnects"] += 1
+
+    def prerender(self, pane, url):
+        if self.page is not None and self.owner is pane and same_target(self.target, url):
+            return
+        self.cancel()
+        from engine import create_page
+
+        self.page = create_page(self)
+        self.page.loadFinished.connect(self.on_prerender_finished)
+        self.owner = pane
+        self.target = url
+        self.loaded = False
+        self.page.setUrl(QUrl(url))
+        self.expiry_timer.start(settings.value("preload/ttl_ms"))
+        self.stats["prerenders"] += 1
+
+    def on_prerender_finished(self, ok):
+        if self.sender() is self.page:
+            self.loaded = ok
+
+    # -------- Commit --------
+    def take(self, pane, url):
+        """
+        Called when pane commits to url. Returns (page, loaded) if url was
+        prerendered for this pane, otherwise (None, False) after dropping
+        whatever was prerendered.
+        """
+        if self.pending is not None and self.pending[0] is pane:
+            self.typing_timer.stop()
+            self.pending = None
+        if self.page is None or self.owner is not pane or not same_target(self.target, url):
+            if self.owner is pane:
+                self.cancel()
+            return None, False
+
+        page, loaded = self.page, self.loaded
+        page.loadFinished.disconnect(self.on_prerender_finished)
+        self.page = None
+        self.owner = None
+        self.target = None
+        self.expiry_timer.stop()
+        self.stats["hits"] += 1
+        return page, loaded
+
+    def preconnected(self, url):
+        qurl = QUrl(url)
+        return f"{qurl.scheme()}://{qurl.authority()}" == self.connected_origin
+
+    def cancel(self):
+        self.expiry_timer.stop()
+        if self.page is None:
+            return
+        self.page.deleteLater()
+        self.page = None
+        self.owner = None
+        self.target = None
+        self.stats["cancelled"] += 1
+
+    def forget(self, pane):
+        """
+        Drop everything pending for a pane that is being closed.
+        """
+        if self.pending is not None and self.pending[0] is pane:
+            self.typing_timer.stop()
+            self.pending = None
+        if self.owner is pane:
+            self.cancel()
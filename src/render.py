@@ -0,0 +1,250 @@
+"""
+Headless batch rendering for --render.
+
+Every URL is loaded and saved as a PDF and/or a full-page PNG, without a
+window, under Qt's offscreen platform. Pages are loaded by a pool of
+render/pool_size views that are reused from one URL to the next, so at
+most that many pages load at once. A page that has not been loaded and
+saved within render/timeout_ms is given up on, and its view is replaced.
+
+The output directory gets one file per page and format, named after the
+URL's position in the list and its address, and manifest.json:
+
+    {"summary": {"pages": 100, "ok": 97, "failed": 2, "timeout": 1,
+                 "elapsed_s": 41.2, "pages_per_second": 2.43,
+                 "pool_size": 4, "formats": ["pdf", "png"]},
+     "pages": [{"index": 0, "url": "...", "status": "ok", "title": "...",
+                "load_ms": 812.4, "total_ms": 1302.0,
+                "pdf": "0000-example-com.pdf", "png": "0000-example-com.png"},
+               ...]}
+
+File names in the manifest are relative to the output directory. The
+summary is also printed to stderr, to compare pool sizes.
+"""
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, QTimer, QUrl
+from PyQt6.QtWidgets import QApplication
+
+FORMATS = ("pdf", "png")
+VIEWPORT_HEIGHT = 800
+# Screenshots of longer pages are cut off at this height
+MAX_PNG_HEIGHT = 16384
+# Time for the page to lay out and paint at its full height before the grab
+PNG_SETTLE_MS = 300
+PAGE_HEIGHT_SCRIPT = """
+Math.max(document.documentElement.scrollHeight,
+         document.body ? document.body.scrollHeight : 0)
+"""
+
+
+def file_stem(index, url):
+    qurl = QUrl(url)
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", qurl.host() + qurl.path()).strip("-")
+    return f"{index:04d}-{slug[:60] or 'page'}"
+
+
+class Job:
+    def __init__(self, index, url):
+        self.started = None
+        self.steps = []
+        self.record = {"index": index, "url": url, "status": None}
+
+
+class RenderSlot(QObject):
+    """
+    One view of the pool, rendering one job at a time.
+    """
+
+    def __init__(self, renderer, parent=None):
+        super().__init__(parent)
+        self.renderer = renderer
+        self.job = None
+        self.view = None
+        self.pending_pdf = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.on_timeout)
+        self.create_view()
+
+    def create_view(self):
+        from engine import create_view
+
+        if self.view is not None:
+            self.view.deleteLater()
+        self.view = create_view()
+        self.view.loadFinished.connect(self.on_load_finished)
+        self.view.page().pdfPrintingFinished.connect(self.on_pdf_finished)
+        self.view.resize(self.renderer.width, VIEWPORT_HEIGHT)
+        # Offscreen windows still count as visible, so pages render normally
+        self.view.show()
+
+    def run(self, job):
+        self.job = job
+        job.started = time.monotonic()
+        job.steps = [name for name in FORMATS if name in self.renderer.formats]
+        self.view.resize(self.renderer.width, VIEWPORT_HEIGHT)
+        self.timer.start(self.renderer.timeout_ms)
+        self.view.setUrl(QUrl(job.record["url"]))
+
+    def elapsed_ms(self):
+        return round((time.monotonic() - self.job.started) * 1000, 1)
+
+    def on_load_finished(self, ok):
+        # Pages can finish loading again (scripted navigations); only the
+        # first load of a job counts. A view replaced after a timeout may
+        # still report its abandoned load.
+        if self.job is None or "load_ms" in self.job.record or self.sender() is not self.view:
+            return
+        self.job.record["load_ms"] = self.elapsed_ms()
+        self.job.record["title"] = self.view.title()
+        if ok:
+            self.next_step()
+        else:
+            self.done("failed")
+
+    def next_step(self):
+        job = self.job
+        if not job.steps:
+            self.done("ok")
+            return
+        step = job.steps.pop(0)
+        path = os.path.join(self.renderer.output_dir, file_stem(job.record["index"], job.record["url"]))
+        if step == "png":
+            self.view.page().runJavaScript(
+                PAGE_HEIGHT_SCRIPT, 0, lambda height: self.on_page_height(job, height, path + ".png")
+            )
+        else:
+            self.pending_pdf = path + ".pdf"
+            self.view.page().printToPdf(self.pending_pdf)
+
+    def on_page_height(self, job, height, path):
+        if job is not self.job:
+            return
+        try:
+            height = int(height)
+        except (TypeError, ValueError):
+            height = VIEWPORT_HEIGHT
+        self.view.resize(self.renderer.width, min(max(height, VIEWPORT_HEIGHT), MAX_PNG_HEIGHT))
+        QTimer.singleShot(PNG_SETTLE_MS, lambda: self.save_png(job, path))
+
+    def save_png(self, job, path):
+        if job is not self.job:
+            return
+        if self.view.grab().save(path, "PNG"):
+            job.record["png"] = os.path.basename(path)
+        else:
+            job.record.setdefault("errors", []).append("png")
+        self.next_step()
+
+    def on_pdf_finished(self, file_path, success):
+        if self.job is None or file_path != self.pending_pdf:
+            return
+        self.pending_pdf = None
+        if success:
+            self.job.record["pdf"] = os.path.basename(file_path)
+        else:
+            self.job.record.setdefault("errors", []).append("pdf")
+        self.next_step()
+
+    def on_timeout(self):
+        if self.job is None:
+            return
+        # Whatever the old page still does must not reach the next job
+        self.pending_pdf = None
+        self.create_view()
+        self.done("timeout")
+
+    def done(self, status):
+        self.timer.stop()
+        job, self.job = self.job, None
+        job.record["status"] = status
+        if status == "ok" and job.record.get("errors"):
+            job.record["status"] = "failed"
+        job.record["total_ms"] = round((time.monotonic() - job.started) * 1000, 1)
+        self.renderer.job_done(self, job)
+
+
+class BatchRenderer(QObject):
+    def __init__(self, urls, output_dir, formats=FORMATS, pool_size=4, timeout_ms=30000, width=1280, parent=None):
+        super().__init__(parent)
+        self.output_dir = output_dir
+        self.formats = [name for name in formats if name in FORMATS]
+        self.pool_size = max(1, pool_size)
+        self.timeout_ms = timeout_ms
+        self.width = width
+        self.queue = deque(Job(index, url) for index, url in enumerate(urls))
+        self.total = len(self.queue)
+        self.records = []
+        self.slots = []
+        self.busy = 0
+        self.started = None
+        self.summary = None
+        # Called with the summary once every page is done
+        self.finished = None
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.started = time.monotonic()
+        for _ in range(min(self.pool_size, len(self.queue))):
+            slot = RenderSlot(self, self)
+            self.slots.append(slot)
+            self.busy += 1
+            slot.run(self.queue.popleft())
+        if not self.busy:
+            self.finish()
+
+    def job_done(self, slot, job):
+        self.records.append(job.record)
+        print(f"render: {job.record['status']} {job.record['url']}", file=sys.stderr)
+        if self.queue:
+            slot.run(self.queue.popleft())
+            return
+        self.busy -= 1
+        if not self.busy:
+            self.finish()
+
+    def done(self):
+        return self.summary is not None
+
+    def finish(self):
+        elapsed = time.monotonic() - self.started
+        statuses = [record["status"] for record in self.records]
+        self.summary = {
+            "pages": self.total,
+            "ok": statuses.count("ok"),
+            "failed": statuses.count("failed"),
+            "timeout": statuses.count("timeout"),
+            "elapsed_s": round(elapsed, 3),
+            "pages_per_second": round(self.total / elapsed, 3) if elapsed > 0 else None,
+            "pool_size": self.pool_size,
+            "formats": self.formats,
+        }
+        self.records.sort(key=lambda record: record["index"])
+        with open(os.path.join(self.output_dir, "manifest.json"), "w") as f:
+            json.dump({"summary": self.summary, "pages": self.records}, f, indent=2)
+        for slot in self.slots:
+            slot.view.deleteLater()
+        print("render: " + json.dumps(self.summary), file=sys.stderr)
+        if self.finished:
+            self.finished(self.summary)
+
+
+def render_batch(urls, output_dir, formats, pool_size, timeout_ms, width):
+    """
+    Render urls into output_dir and return the process exit status: 0 if
+    every page was saved, 1 otherwise. Runs the event loop of the existing
+    QApplication until done.
+    """
+    app = QApplication.instance()
+    renderer = BatchRenderer(urls, output_dir, formats, pool_size, timeout_ms, width)
+    renderer.finished = lambda summary: app.quit()
+    QTimer.singleShot(0, renderer.start)
+    app.exec()
+    summary = renderer.summary
+    return 0 if summary and summary["ok"] == summary["pages"] else 1
@@ -0,0 +1,84 @@
+"""
+Session persistence for the pane strip.
+
+A session is a small JSON document:
+
+    {"version": 1, "scroll": 840, "panes": [
+        {"url": "https://example.com/", "width": 1280, "history": "<base64>"},
+        ...
+    ]}
+
+"width" is only present for panes whose width was fixed by the user, and
+"history" only when history saving is enabled. Files are written through
+QSaveFile, so a crash mid-write never leaves a truncated session behind.
+"""
+import json
+import math
+import os
+from os import path
+from PyQt6.QtCore import QIODevice, QSaveFile, QStandardPaths
+
+SESSION_VERSION = 1
+
+
+def number(value):
+    """
+    value if it is a finite number, else None. Session files are read back
+    without trusting their contents.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return value if math.isfinite(value) else None
+
+
+class SessionStore:
+    def __init__(self, file_path=""):
+        if not file_path:
+            file_path = path.join(
+                QStandardPaths.writableLocation(
+                    QStandardPaths.StandardLocation.AppDataLocation
+                ),
+                "session.json",
+            )
+        self.file_path = file_path
+        self.last_written = None
+
+    def load(self):
+        """
+        Return the saved session, or None if there is none or it is unreadable.
+        """
+        try:
+            with open(self.file_path, "rb") as f:
+                contents = f.read()
+            state = json.loads(contents)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or state.get("version") != SESSION_VERSION:
+            return None
+        if not isinstance(state.get("panes"), list):
+            return None
+        self.last_written = contents
+        return state
+
+    def save(self, state):
+        """
+        Atomically write state. Nothing is written if it did not change
+        since the last load or save.
+        """
+        state = dict(state, version=SESSION_VERSION)
+        contents = json.dumps(state, separators=(",", ":")).encode("utf-8")
+        if contents == self.last_written:
+            return True
+
+        try:
+            os.makedirs(path.dirname(self.file_path) or ".", exist_ok=True)
+        except OSError:
+            return False
+        save_file = QSaveFile(self.file_path)
+        if not save_file.open(QIODevice.OpenModeFlag.WriteOnly):
+            return False
+        save_file.write(contents)
+        if not save_file.commit():
+            return False
+        self.last_written = contents
+        return True
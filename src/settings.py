@@ -0,0 +1,34 @@
+"""
+User settings for Fasemo.
+
+Values are read from QSettings, falling back to the defaults in
+const_default_settings. Command-line options are applied on top as
+overrides and are never written back to disk.
+"""
+from PyQt6.QtCore import QSettings
+from constants import const_default_settings
+
+
+class Settings:
+    def __init__(self):
+        self.store = QSettings("Cinemint", "Fasemo")
+        self.overrides = {}
+
+    def value(self, key):
+        if key in self.overrides:
+            return self.overrides[key]
+        default = const_default_settings[key]
+        return self.store.value(key, default, type=type(default))
+
+    def set_value(self, key, value):
+        self.store.setValue(key, value)
+
+    def override(self, key, value):
+        """
+        Override a setting for this process only (used for CLI options).
+        """
+        if value is not None:
+            self.overrides[key] = value
+
+
+settings = Settings()
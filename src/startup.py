@@ -0,0 +1,86 @@
+"""
+Startup timing for --measure-startup.
+
+Milestones are recorded in seconds since the process started. On Linux
+the process start time comes from /proc, which also covers interpreter
+start-up and PyInstaller's unpacking; elsewhere it is the moment
+fasemo.py began importing.
+"""
+import json
+import sys
+from time import perf_counter
+
+
+def process_age():
+    """
+    Seconds since this process was started, or None if unknown.
+    """
+    try:
+        from os import sysconf
+
+        with open("/proc/self/stat") as f:
+            # The command name may contain spaces, so split after it
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        start_ticks = int(fields[19])
+        return uptime - start_ticks / sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, ImportError):
+        return None
+
+
+class StartupProfile:
+    def __init__(self):
+        self.enabled = False
+        self.output = None
+        self.origin = perf_counter()
+        self.marks = {}
+        self.details = {}
+
+    def start(self, started_at, output):
+        """
+        Begin recording. started_at is the perf_counter() value taken as
+        early as possible in fasemo.py; output is a file name or "-".
+        """
+        self.enabled = True
+        self.output = output
+        age = process_age()
+        # Express every mark relative to the real process start if known
+        self.origin = perf_counter() - age if age is not None else started_at
+        self.marks["script_start"] = started_at - self.origin
+
+    def mark(self, name):
+        """
+        Record a milestone the first time it is reached.
+        """
+        if self.enabled and name not in self.marks:
+            self.marks[name] = perf_counter() - self.origin
+
+    def note(self, name, value):
+        """
+        Add a value other than a time to the record.
+        """
+        if self.enabled:
+            self.details[name] = value
+
+    def finish(self):
+        """
+        Write the recorded marks once and stop recording.
+        """
+        if self.enabled:
+            self.enabled = False
+            self.write()
+
+    def write(self):
+        record = {name: round(seconds, 4) for name, seconds in self.marks.items()}
+        record.update(self.details)
+        record["frozen"] = bool(getattr(sys, "frozen", False))
+        line = json.dumps(record)
+        if self.output in (None, "-"):
+            print(line, file=sys.stderr)
+        else:
+            with open(self.output, "a") as f:
+                f.write(line + "\n")
+
+
+startup = StartupProfile()
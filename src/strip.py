@@ -0,0 +1,470 @@
+"""
+Layout for the horizontal strip of browser panes.
+
+The strip is a row of [pane, handle] slots followed by one trailing widget
+(the wallpaper). Panes and their slot widths are kept in a balanced tree
+ordered by position (SlotTree), so inserting, removing and moving a pane,
+finding the x position or the index of a pane, the pane at an index,
+hit-testing an x coordinate and computing a drop index are O(log n), and
+looking a pane up by id is O(1). Geometry is only reapplied from the first slot that changed onwards, and
+widgets whose geometry did not change are left alone.
+"""
+from collections.abc import Sequence
+from random import Random
+from PyQt6.QtCore import QEvent, QRect, QSize
+from PyQt6.QtWidgets import QLayout, QWidgetItem
+
+# Width of a pane that has not been given one
+MIN_PANE_WIDTH = 320
+
+
+def widget_width(widget, minimum=0):
+    """
+    Width widget asks for. Taken from the widget itself rather than from a
+    QWidgetItem, whose sizeHint() is empty while the widget is hidden, as
+    panes are when they are inserted. A fixed or minimum width set on the
+    widget wins over its size hint.
+    """
+    widget.ensurePolished()
+    if widget.minimumWidth() > 0:
+        return widget.minimumWidth()
+    return max(minimum, widget.minimumSizeHint().width())
+
+
+class Slot:
+    __slots__ = ("key", "width", "priority", "left", "right", "parent", "size", "total")
+
+    def __init__(self, key, width, priority):
+        self.key = key
+        self.width = width
+        self.priority = priority
+        self.left = None
+        self.right = None
+        self.parent = None
+        self.size = 1
+        self.total = width
+
+
+def size(node):
+    return node.size if node is not None else 0
+
+
+def update(node):
+    """
+    Recompute node's subtree size and width from its children, and make
+    them point back at it.
+    """
+    node.size = 1
+    node.total = node.width
+    for child in (node.left, node.right):
+        if child is not None:
+            child.parent = node
+            node.size += child.size
+            node.total += child.total
+    return node
+
+
+def merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = merge(left.right, right)
+        return update(left)
+    right.left = merge(left, right.left)
+    return update(right)
+
+
+def split(node, count):
+    """
+    Split the subtree into its first count slots and the rest.
+    """
+    if node is None:
+        return None, None
+    if size(node.left) >= count:
+        left, node.left = split(node.left, count)
+        if left is not None:
+            left.parent = None
+        return left, update(node)
+    node.right, right = split(node.right, count - size(node.left) - 1)
+    if right is not None:
+        right.parent = None
+    return update(node), right
+
+
+class SlotTree(Sequence):
+    """
+    A sequence of keys with a width each, as a treap ordered by position.
+    Inserting, removing and moving a key, changing its width, finding its
+    index, the key at an index, prefix sums of the widths and searching
+    them are all O(log n).
+    """
+
+    def __init__(self, seed=0):
+        self.root = None
+        self.nodes = {}  # key -> Slot
+        self.random = Random(seed)
+
+    def __len__(self):
+        return size(self.root)
+
+    def __contains__(self, key):
+        return key in self.nodes
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        node = self.root
+        while True:
+            left = size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node.key
+            else:
+                index -= left + 1
+                node = node.right
+
+    def __iter__(self):
+        for key, _ in self.slots():
+            yield key
+
+    def index(self, key):
+        node = self.nodes[key]
+        index = size(node.left)
+        while node.parent is not None:
+            if node is node.parent.right:
+                index += size(node.parent.left) + 1
+            node = node.parent
+        return index
+
+    def insert(self, index, key, width):
+        node = Slot(key, width, self.random.random())
+        self.nodes[key] = node
+        self.attach(index, node)
+
+    def remove(self, key):
+        """
+        Take key out and return its width.
+        """
+        node = self.detach(key)
+        del self.nodes[key]
+        return node.width
+
+    def move(self, key, index):
+        self.attach(index, self.detach(key))
+
+    def attach(self, index, node):
+        node.left = node.right = node.parent = None
+        update(node)
+        left, right = split(self.root, index)
+        self.root = merge(merge(left, node), right)
+        self.root.parent = None
+
+    def detach(self, key):
+        node = self.nodes[key]
+        left, rest = split(self.root, self.index(key))
+        _, right = split(rest, 1)
+        self.root = merge(left, right)
+        if self.root is not None:
+            self.root.parent = None
+        return node
+
+    def width(self, key):
+        return self.nodes[key].width
+
+    def set_width(self, key, width):
+        node = self.nodes[key]
+        delta = width - node.width
+        node.width = width
+        while node is not None:
+            node.total += delta
+            node = node.parent
+
+    def prefix(self, index):
+        """
+        Sum of the first index widths.
+        """
+        total = 0
+        node = self.root
+        while node is not None and index > 0:
+            left = size(node.left)
+            if index <= left:
+                node = node.left
+            else:
+                total += (node.left.total if node.left else 0) + node.width
+                index -= left + 1
+                node = node.right
+        return total
+
+    def total(self):
+        return self.root.total if self.root is not None else 0
+
+    def search(self, x):
+        """
+        Return the index of the slot whose span contains offset x, i.e.
+        the largest i with prefix(i) <= x. Returns len(self) when x is
+        past the end.
+        """
+        index = 0
+        node = self.root
+        while node is not None:
+            left = node.left.total if node.left else 0
+            if x < left:
+                node = node.left
+            elif x < left + node.width:
+                return index + size(node.left)
+            else:
+                x -= left + node.width
+                index += size(node.left) + 1
+                node = node.right
+        return index
+
+    def slots(self, start=0):
+        """
+        Yield (key, width) from index start onwards.
+        """
+        if start >= len(self):
+            return
+        node = self.nodes[self[max(start, 0)]]
+        while node is not None:
+            yield node.key, node.width
+            # In-order successor
+            if node.right is not None:
+                node = node.right
+                while node.left is not None:
+                    node = node.left
+            else:
+                while node.parent is not None and node is node.parent.right:
+                    node = node.parent
+                node = node.parent
+
+
+class StripLayout(QLayout):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # Panes in strip order, with their slot widths: pane + handle + spacing
+        self.panes = SlotTree()
+        self.handles = {}  # pane -> handle widget
+        self.items = {}  # pane or handle widget -> QWidgetItem
+        self.pane_ids = {}  # str(id(pane)) -> pane, used for drag and drop
+        self.pane_widths = {}  # pane -> width in pixels
+        self.trailing = None
+        self.dirty_from = 0
+        self.last_origin = None
+        # Geometry passes and widgets actually moved or resized, for the
+        # diagnostics
+        self.passes = 0
+        self.moves = 0
+
+    # -------- Strip model --------
+    def gap(self):
+        return max(self.spacing(), 0)
+
+    def slot_width(self, pane):
+        handle_width = widget_width(self.handles[pane])
+        return self.pane_widths[pane] + handle_width + 2 * self.gap()
+
+    def mark_dirty(self, index):
+        self.dirty_from = min(self.dirty_from, index)
+        self.invalidate()
+
+    def insert_pane(self, index, pane, handle):
+        self.addChildWidget(pane)
+        self.addChildWidget(handle)
+        self.items[pane] = QWidgetItem(pane)
+        self.items[handle] = QWidgetItem(handle)
+        self.handles[pane] = handle
+        self.pane_ids[str(id(pane))] = pane
+        self.pane_widths[pane] = widget_width(pane, MIN_PANE_WIDTH)
+        # Picks up size hint changes, e.g. the placeholder being replaced
+        pane.installEventFilter(self)
+
+        self.panes.insert(index, pane, self.slot_width(pane))
+        self.mark_dirty(index)
+
+    def refresh_pane(self, pane):
+        """
+        Re-read the width of pane and its handle from their widgets.
+        """
+        old_width = self.pane_widths[pane]
+        self.pane_widths[pane] = widget_width(pane, MIN_PANE_WIDTH)
+        slot = self.slot_width(pane)
+        if self.pane_widths[pane] != old_width or slot != self.panes.width(pane):
+            self.panes.set_width(pane, slot)
+            self.mark_dirty(self.panes.index(pane))
+
+    def eventFilter(self, source, event):
+        if source in self.panes and event.type() in (
+            QEvent.Type.LayoutRequest,
+            QEvent.Type.Show,
+        ):
+            self.refresh_pane(source)
+        return False
+
+    def remove_pane(self, pane):
+        """
+        Take pane and its handle out of the strip. Returns the handle.
+        """
+        pane.removeEventFilter(self)
+        index = self.panes.index(pane)
+        self.panes.remove(pane)
+        handle = self.handles.pop(pane)
+        del self.items[pane]
+        del self.items[handle]
+        del self.pane_ids[str(id(pane))]
+        del self.pane_widths[pane]
+        self.mark_dirty(index)
+        return handle
+
+    def move_pane(self, pane, index):
+        old_index = self.panes.index(pane)
+        if old_index == index:
+            return
+        self.panes.move(pane, index)
+        self.mark_dirty(min(old_index, index))
+
+    def set_pane_width(self, pane, width):
+        width = int(width)
+        pane.setFixedWidth(width)
+        if self.pane_widths[pane] == width:
+            return
+        self.pane_widths[pane] = width
+        self.panes.set_width(pane, self.slot_width(pane))
+        self.mark_dirty(self.panes.index(pane))
+
+    def pane_width(self, pane):
+        return self.pane_widths[pane]
+
+    def index_of(self, pane):
+        return self.panes.index(pane)
+
+    def pane_for_id(self, pane_id):
+        return self.pane_ids.get(pane_id)
+
+    def handle_for(self, pane):
+        return self.handles[pane]
+
+    # -------- Geometry queries --------
+    def origin(self):
+        return self.geometry().x() + self.contentsMargins().left()
+
+    def pane_x(self, index):
+        """
+        x coordinate of the pane at index (or of the end of the strip
+        when index == len(panes)), in the parent widget's coordinates.
+        """
+        return self.origin() + self.panes.prefix(index)
+
+    def pane_index_at(self, x):
+        """
+        Index of the slot under x, or len(panes) if x is past the last one.
+        """
+        return self.panes.search(x - self.origin())
+
+    def insert_index_at(self, x):
+        """
+        Index at which a pane dropped at x should be inserted: before the
+        pane under x if x is in its left half, after it otherwise.
+        """
+        index = self.pane_index_at(x)
+        if index >= len(self.panes):
+            return len(self.panes)
+        pane = self.panes[index]
+        if x < self.pane_x(index) + self.pane_widths[pane] / 2:
+            return index
+        return index + 1
+
+    def panes_between(self, left, right):
+        """
+        Panes that intersect the horizontal span [left, right).
+        """
+        index = self.pane_index_at(max(left, self.origin()))
+        x = self.pane_x(index)
+        result = []
+        for pane, slot in self.panes.slots(index):
+            if x >= right:
+                break
+            if x + self.pane_widths[pane] > left:
+                result.append(pane)
+            x += slot
+        return result
+
+    # -------- QLayout interface --------
+    def addItem(self, item):
+        # Anything added through addWidget() becomes the trailing widget
+        self.trailing = item
+        self.invalidate()
+
+    def count(self):
+        return 2 * len(self.panes) + (1 if self.trailing is not None else 0)
+
+    def itemAt(self, index):
+        if 0 <= index < 2 * len(self.panes):
+            pane = self.panes[index // 2]
+            widget = pane if index % 2 == 0 else self.handles[pane]
+            return self.items[widget]
+        if index == 2 * len(self.panes) and self.trailing is not None:
+            return self.trailing
+        return None
+
+    def takeAt(self, index):
+        if 0 <= index < 2 * len(self.panes):
+            item = self.itemAt(index)
+            self.remove_pane(self.panes[index // 2])
+            return item
+        if index == 2 * len(self.panes) and self.trailing is not None:
+            item = self.trailing
+            self.trailing = None
+            self.invalidate()
+            return item
+        return None
+
+    def sizeHint(self):
+        margins = self.contentsMargins()
+        width = margins.left() + self.panes.total() + margins.right()
+        if self.trailing is not None:
+            width += self.trailing.sizeHint().width()
+        return QSize(width, margins.top() + margins.bottom())
+
+    def minimumSize(self):
+        return self.sizeHint()
+
+    def place(self, widget, rect):
+        if widget.geometry() != rect:
+            widget.setGeometry(rect)
+            self.moves += 1
+
+    def setGeometry(self, rect):
+        super().setGeometry(rect)
+        self.passes += 1
+        margins = self.contentsMargins()
+        top = rect.y() + margins.top()
+        height = rect.height() - margins.top() - margins.bottom()
+
+        # Only a change in origin or height affects every slot; the width
+        # of the strip itself does not move any pane.
+        origin = (rect.x(), top, height)
+        if origin != self.last_origin:
+            self.last_origin = origin
+            self.dirty_from = 0
+
+        gap = self.gap()
+        start = self.dirty_from
+        x = self.pane_x(start)
+        for pane, slot in self.panes.slots(start):
+            width = self.pane_widths[pane]
+            self.place(pane, QRect(x, top, width, height))
+            handle_width = slot - width - 2 * gap
+            self.place(
+                self.handles[pane], QRect(x + width + gap, top, handle_width, height)
+            )
+            x += slot
+        self.dirty_from = len(self.panes)
+
+        if self.trailing is not None and self.trailing.widget() is not None:
+            width = self.trailing.sizeHint().width()
+            self.place(self.trailing.widget(), QRect(x, top, width, height))
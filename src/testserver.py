@@ -0,0 +1,147 @@
+"""
+Local HTTP server used as a fixture for cache checks, benchmarks and
+headless runs.
+
+    /page/<n>     an HTML page that pulls in every asset below
+    /asset/<i>    a cacheable subresource (stylesheet, script or image)
+    /slow/<ms>    a page that takes <ms> milliseconds to respond
+
+Every response counts towards server.hits, so a run can compare what the
+browser asked for with what actually reached the network.
+
+    python3 testserver.py --port 8000 --assets 40 --asset-kb 64
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ASSET_TYPES = [
+    ("css", "text/css"),
+    ("js", "application/javascript"),
+    ("svg", "image/svg+xml"),
+]
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, content_type, max_age=0):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Timing-Allow-Origin", "*")
+        if max_age:
+            self.send_header("Cache-Control", f"public, max-age={max_age}")
+        else:
+            self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        parts = self.path.split("?")[0].strip("/").split("/")
+        with server.lock:
+            server.hits[parts[0]] += 1
+
+        if parts[0] == "page" and len(parts) == 2:
+            self.send_body(server.page(parts[1]), "text/html; charset=utf-8")
+        elif parts[0] == "asset" and len(parts) == 2:
+            name = parts[1]
+            extension = name.rsplit(".", 1)[-1]
+            content_type = dict(ASSET_TYPES).get(extension, "text/plain")
+            self.send_body(server.asset(name), content_type, server.max_age)
+        elif parts[0] == "slow" and len(parts) == 2 and parts[1].isdigit():
+            time.sleep(int(parts[1]) / 1000)
+            self.send_body(server.page("slow"), "text/html; charset=utf-8")
+        else:
+            self.send_error(404)
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, assets=20, asset_kb=16, max_age=3600):
+        super().__init__(("127.0.0.1", port), FixtureHandler)
+        self.assets = assets
+        self.asset_bytes = asset_kb * 1024
+        self.max_age = max_age
+        self.hits = Counter()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def page(self, name):
+        tags = []
+        for i in range(self.assets):
+            extension, _ = ASSET_TYPES[i % len(ASSET_TYPES)]
+            url = f"/asset/{i}.{extension}"
+            if extension == "css":
+                tags.append(f'<link rel="stylesheet" href="{url}">')
+            elif extension == "js":
+                tags.append(f'<script src="{url}"></script>')
+            else:
+                tags.append(f'<img src="{url}" width="16" height="16">')
+        words = " ".join(f"fixture page {name} paragraph {i}" for i in range(50))
+        return (
+            f"<!DOCTYPE html><html><head><title>Fixture {name}</title>"
+            + "".join(tag for tag in tags if not tag.startswith("<img"))
+            + f"</head><body><h1>Fixture {name}</h1><p>{words}</p>"
+            + "".join(tag for tag in tags if tag.startswith("<img"))
+            + "</body></html>"
+        ).encode("utf-8")
+
+    def asset(self, name):
+        extension = name.rsplit(".", 1)[-1]
+        if extension == "css":
+            line = b"/* padding */ body { margin: 0; }\n"
+        elif extension == "js":
+            line = b"/* padding */ void 0;\n"
+        else:
+            line = b"<!-- padding -->\n"
+        body = line * (self.asset_bytes // len(line) + 1)
+        if extension == "svg":
+            body = b'<svg xmlns="http://www.w3.org/2000/svg">' + body + b"</svg>"
+        return body
+
+    def start(self):
+        """
+        Serve from a background thread. Returns the base URL.
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="testserver")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--assets", type=int, default=20)
+    parser.add_argument("--asset-kb", type=int, default=16)
+    parser.add_argument("--max-age", type=int, default=3600)
+    args = parser.parse_args()
+
+    server = FixtureServer(args.port, args.assets, args.asset_kb, args.max_age)
+    print(f"Serving fixture pages at {server.base_url}/page/1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(dict(server.hits))
+
+
+if __name__ == "__main__":
+    main()
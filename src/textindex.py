@@ -0,0 +1,295 @@
+"""
+Full-text search over the visible text of every open pane.
+
+Each pane's text (document.body.innerText, see engine.extract_text) is
+taken after its page finishes loading and again after the page changed a
+good amount of its text (engine.TEXT_OBSERVER_SCRIPT). Texts are queued
+and tokenized on a background thread into an in-memory inverted index:
+
+    term -> {pane: occurrences}
+
+Queries match panes containing all of their words, the last word as a
+prefix (of at least MIN_PREFIX characters) since it may still be being
+typed, and rank them with BM25. Title words count TITLE_WEIGHT times.
+Prefixes are looked up through buckets of the terms sharing their first
+two and three characters, so a query costs a few dictionary lookups per
+word rather than a walk over the vocabulary.
+"""
+import math
+import queue
+import re
+import threading
+from collections import Counter
+from PyQt6.QtCore import QModelIndex, Qt
+from PyQt6.QtGui import QStandardItem, QStandardItemModel
+from PyQt6.QtWidgets import QCompleter, QLineEdit
+
+TOKEN = re.compile(r"\w+")
+# Text beyond this many characters of a page is not indexed
+MAX_TEXT = 200000
+# A shorter last word only matches itself
+MIN_PREFIX = 2
+TITLE_WEIGHT = 3
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+SNIPPET_CHARS = 60
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+class Document:
+    __slots__ = ("url", "title", "text", "lowered", "terms", "length")
+
+    def __init__(self, url, title, text, terms):
+        self.url = url
+        self.title = title
+        self.text = text
+        # For finding snippets without case-insensitive regex searches
+        self.lowered = text.lower()
+        self.terms = terms
+        self.length = sum(terms.values())
+
+
+class TextIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.postings = {}  # term -> {pane: count}
+        self.buckets = {}  # first 2 and first 3 characters -> set of terms
+        self.documents = {}  # pane -> Document
+        self.total_length = 0
+        self.updates = 0
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.index_loop, daemon=True)
+        self.thread.start()
+
+    # -------- Updates (queued) --------
+    def submit(self, pane, url, title, text):
+        """
+        Queue the text of pane to replace whatever was indexed for it.
+        """
+        self.queue.put((pane, url, title or "", (text or "")[:MAX_TEXT]))
+
+    def remove(self, pane):
+        self.queue.put((pane, None, None, None))
+
+    def flush(self):
+        """
+        Block until every queued text has been indexed.
+        """
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def index_loop(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            pane, url, title, text = item
+            document = None
+            if text is not None:
+                # Tokenizing is the expensive part; it runs without the lock
+                terms = Counter(tokenize(text))
+                for term in tokenize(title):
+                    terms[term] += TITLE_WEIGHT
+                document = Document(url, title, text, terms)
+            with self.lock:
+                self.drop(pane)
+                if document is not None:
+                    self.add(pane, document)
+                self.updates += 1
+
+    def add(self, pane, document):
+        self.documents[pane] = document
+        self.total_length += document.length
+        for term, count in document.terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                for key in bucket_keys(term):
+                    self.buckets.setdefault(key, set()).add(term)
+            postings[pane] = count
+
+    def drop(self, pane):
+        document = self.documents.pop(pane, None)
+        if document is None:
+            return
+        self.total_length -= document.length
+        for term in document.terms:
+            postings = self.postings[term]
+            del postings[pane]
+            if not postings:
+                del self.postings[term]
+                for key in bucket_keys(term):
+                    bucket = self.buckets[key]
+                    bucket.discard(term)
+                    if not bucket:
+                        del self.buckets[key]
+
+    # -------- Queries --------
+    def expand(self, prefix):
+        """
+        Return the indexed terms that start with prefix.
+        """
+        if len(prefix) < MIN_PREFIX:
+            return [prefix] if prefix in self.postings else []
+        bucket = self.buckets.get(prefix[:3], ())
+        if len(prefix) <= 3:
+            return list(bucket)
+        return [term for term in bucket if term.startswith(prefix)]
+
+    def search(self, text, limit=10):
+        """
+        Return up to limit (pane, title, url, snippet, word) for the panes
+        containing all words of text, best first. word is the matched term
+        the snippet shows, for highlighting in the page.
+        """
+        words = tokenize(text)
+        if not words:
+            return []
+        with self.lock:
+            count = len(self.documents)
+            if not count:
+                return []
+            average_length = self.total_length / count
+
+            # Per query word: {pane: occurrences} and the terms it matched
+            matches = []
+            for i, word in enumerate(words):
+                if i == len(words) - 1:
+                    terms = self.expand(word)
+                else:
+                    terms = [word] if word in self.postings else []
+                occurrences = Counter()
+                for term in terms:
+                    occurrences.update(self.postings[term])
+                if not occurrences:
+                    return []
+                matches.append((occurrences, terms))
+
+            # Intersect from the rarest word up
+            matches.sort(key=lambda match: len(match[0]))
+            candidates = set(matches[0][0])
+            for occurrences, _ in matches[1:]:
+                candidates.intersection_update(occurrences)
+                if not candidates:
+                    return []
+
+            scores = {}
+            for occurrences, _ in matches:
+                idf = math.log(1 + (count - len(occurrences) + 0.5) / (len(occurrences) + 0.5))
+                for pane in candidates:
+                    tf = occurrences[pane]
+                    length = self.documents[pane].length
+                    scores[pane] = scores.get(pane, 0) + idf * tf * (K1 + 1) / (
+                        tf + K1 * (1 - B + B * length / average_length)
+                    )
+
+            best = sorted(scores, key=scores.get, reverse=True)[:limit]
+            # The snippet shows the rarest word, as one of its terms the
+            # pane contains
+            terms = matches[0][1]
+            results = []
+            for pane in best:
+                document = self.documents[pane]
+                word = next(term for term in terms if pane in self.postings[term])
+                results.append(
+                    (pane, document.title, document.url, snippet(document, word), word)
+                )
+            return results
+
+    def stats(self):
+        with self.lock:
+            return {
+                "panes": len(self.documents),
+                "terms": len(self.postings),
+                "tokens": self.total_length,
+                "updates": self.updates,
+            }
+
+
+def bucket_keys(term):
+    return {term[:2], term[:3]}
+
+
+def snippet(document, word):
+    """
+    A short excerpt of a document around the first occurrence of word at
+    the start of a word.
+    """
+    position = document.lowered.find(word)
+    while position > 0 and document.lowered[position - 1].isalnum():
+        position = document.lowered.find(word, position + 1)
+    if position < 0:
+        return ""
+    # Lower-casing can change the length of some characters, so the
+    # excerpt may be off by a few characters in such texts
+    start = max(0, position - SNIPPET_CHARS)
+    excerpt = " ".join(document.text[start : position + len(word) + SNIPPET_CHARS].split())
+    return ("..." if start else "") + excerpt
+
+
+class FindBox(QLineEdit):
+    """
+    Search box that lists the panes matching its text, best first.
+    """
+
+    PANE_ROLE = Qt.ItemDataRole.UserRole + 1
+    WORD_ROLE = Qt.ItemDataRole.UserRole + 2
+
+    def __init__(self, index, limit=10, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.limit = limit
+        # Called with (pane, matched word) when a result is chosen
+        self.pane_chosen = None
+        self.setPlaceholderText("Find in panes")
+        self.setClearButtonEnabled(True)
+
+        self.completer = QCompleter(QStandardItemModel(self), self)
+        self.completer.setCompletionMode(
+            QCompleter.CompletionMode.UnfilteredPopupCompletion
+        )
+        # Every row completes to the query itself, so moving through the
+        # results leaves the text alone
+        self.completer.setCompletionRole(Qt.ItemDataRole.UserRole)
+        self.completer.activated[QModelIndex].connect(self.on_result_activated)
+        self.setCompleter(self.completer)
+        self.textEdited.connect(self.update_results)
+        self.returnPressed.connect(self.choose_best)
+
+    def update_results(self, text):
+        model = self.completer.model()
+        model.clear()
+        for pane, title, url, excerpt, word in self.index.search(text, self.limit):
+            item = QStandardItem(f"{title or url} - {excerpt}" if excerpt else title or url)
+            item.setToolTip(url)
+            item.setData(text, Qt.ItemDataRole.UserRole)
+            item.setData(pane, self.PANE_ROLE)
+            item.setData(word, self.WORD_ROLE)
+            model.appendRow(item)
+        if model.rowCount():
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def choose_best(self):
+        model = self.completer.model()
+        if model.rowCount() and not self.completer.popup().isVisible():
+            self.on_result_activated(model.index(0, 0))
+
+    def on_result_activated(self, index):
+        pane = index.data(self.PANE_ROLE)
+        if pane is not None and self.pane_chosen:
+            self.pane_chosen(pane, index.data(self.WORD_ROLE))
@@ -0,0 +1,222 @@
+"""
+Pane thumbnails and the overview grid.
+
+A pane is captured shortly after its page finishes loading and again when
+it scrolls out of the viewport, while it still shows a rendered frame.
+Captures are scaled down and JPEG-compressed on a worker thread and kept
+in memory; once the cache goes over thumbnails/memory_kb, the thumbnails
+captured longest ago are dropped.
+
+The overview shows every pane as a tile in a grid, using these thumbnails
+and the pane's favicon where there is none. Building it never creates,
+thaws or reloads a view.
+"""
+from collections import OrderedDict
+from PyQt6.QtCore import (
+    QBuffer,
+    QByteArray,
+    QEvent,
+    QIODevice,
+    QObject,
+    QRunnable,
+    QSize,
+    QThreadPool,
+    QTimer,
+    Qt,
+    pyqtSignal,
+)
+from PyQt6.QtGui import QIcon, QPixmap
+from PyQt6.QtWidgets import QListView, QListWidget, QListWidgetItem
+
+JPEG_QUALITY = 70
+# Pages keep painting for a moment after loadFinished
+CAPTURE_DELAY_MS = 500
+
+
+class EncodeSignals(QObject):
+    finished = pyqtSignal(object, int, QByteArray)
+
+
+class EncodeTask(QRunnable):
+    def __init__(self, pane, generation, image, width, signals):
+        super().__init__()
+        self.pane = pane
+        self.generation = generation
+        self.image = image
+        self.width = width
+        self.signals = signals
+
+    def run(self):
+        # Only the QImage is used here; the pane is just handed back
+        scaled = self.image.scaledToWidth(
+            self.width, Qt.TransformationMode.SmoothTransformation
+        )
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        scaled.save(buffer, "JPEG", JPEG_QUALITY)
+        buffer.close()
+        self.signals.finished.emit(self.pane, self.generation, data)
+
+
+class ThumbnailCache(QObject):
+    # Emitted with the pane whose thumbnail was replaced
+    updated = pyqtSignal(object)
+
+    def __init__(self, width=320, memory_kb=16384, parent=None):
+        super().__init__(parent)
+        self.width = width
+        self.limit = memory_kb * 1024
+        self.entries = OrderedDict()  # BrowserContainer -> JPEG QByteArray, oldest first
+        self.total = 0
+        # Captures still being encoded; only the latest one per pane is kept
+        self.generations = {}  # BrowserContainer -> capture number
+        self.captures = 0
+        self.evictions = 0
+
+        self.signals = EncodeSignals(self)
+        self.signals.finished.connect(self.on_encoded)
+
+    def capture(self, pane):
+        """
+        Grab the frame pane currently shows. Frozen and discarded panes
+        are skipped, since their last frame may be stale or blank.
+        """
+        if pane.state() != "active" or not pane.browser.isVisible():
+            return False
+        if pane.browser.width() <= 0 or pane.browser.height() <= 0:
+            return False
+        image = pane.browser.grab().toImage()
+        if image.isNull():
+            return False
+        generation = self.generations.get(pane, 0) + 1
+        self.generations[pane] = generation
+        self.captures += 1
+        QThreadPool.globalInstance().start(
+            EncodeTask(pane, generation, image, self.width, self.signals)
+        )
+        return True
+
+    def capture_later(self, pane):
+        QTimer.singleShot(CAPTURE_DELAY_MS, lambda: self.capture(pane))
+
+    def on_encoded(self, pane, generation, data):
+        if self.generations.get(pane) != generation or data.isEmpty():
+            return
+        del self.generations[pane]
+        old = self.entries.pop(pane, None)
+        if old is not None:
+            self.total -= old.size()
+        self.entries[pane] = data
+        self.total += data.size()
+        while self.total > self.limit and len(self.entries) > 1:
+            _, dropped = self.entries.popitem(last=False)
+            self.total -= dropped.size()
+            self.evictions += 1
+        self.updated.emit(pane)
+
+    def pixmap(self, pane):
+        """
+        Return the thumbnail of pane as a QPixmap, or None.
+        """
+        data = self.entries.get(pane)
+        if data is None:
+            return None
+        pixmap = QPixmap()
+        if not pixmap.loadFromData(data, "JPEG"):
+            return None
+        return pixmap
+
+    def forget(self, pane):
+        self.generations.pop(pane, None)
+        data = self.entries.pop(pane, None)
+        if data is not None:
+            self.total -= data.size()
+
+    def stats(self):
+        return {
+            "thumbnails": len(self.entries),
+            "bytes": self.total,
+            "captures": self.captures,
+            "evictions": self.evictions,
+        }
+
+
+class Overview(QListWidget):
+    def __init__(self, thumbnails, parent=None):
+        super().__init__(parent)
+        self.thumbnails = thumbnails
+        self.items = {}  # BrowserContainer -> QListWidgetItem
+        self.fallback_icons = {}  # BrowserContainer -> QIcon
+
+        # Called with the pane the user picked, or with None to go back
+        self.pane_chosen = None
+        self.covered = None
+
+        tile = QSize(thumbnails.width, thumbnails.width * 10 // 16)
+        self.setViewMode(QListView.ViewMode.IconMode)
+        self.setResizeMode(QListView.ResizeMode.Adjust)
+        self.setMovement(QListView.Movement.Static)
+        self.setUniformItemSizes(True)
+        self.setIconSize(tile)
+        self.setGridSize(QSize(tile.width() + 24, tile.height() + 48))
+        self.setTextElideMode(Qt.TextElideMode.ElideRight)
+        self.itemActivated.connect(self.on_item_activated)
+        self.itemClicked.connect(self.on_item_activated)
+        thumbnails.updated.connect(self.on_thumbnail_updated)
+
+    def cover(self, widget):
+        """
+        Keep the overview laid exactly over widget, a sibling.
+        """
+        self.covered = widget
+        widget.installEventFilter(self)
+        self.setGeometry(widget.geometry())
+
+    def eventFilter(self, source, event):
+        if source is self.covered and event.type() in (QEvent.Type.Resize, QEvent.Type.Move):
+            self.setGeometry(source.geometry())
+        return super().eventFilter(source, event)
+
+    def populate(self, entries):
+        """
+        Fill the grid from (pane, title, fallback icon) tuples in strip order.
+        """
+        self.clear()
+        self.items = {}
+        self.fallback_icons = {}
+        for pane, title, fallback_icon in entries:
+            item = QListWidgetItem(title)
+            item.setToolTip(title)
+            self.items[pane] = item
+            self.fallback_icons[pane] = fallback_icon
+            self.set_item_icon(pane)
+            self.addItem(item)
+
+    def set_item_icon(self, pane):
+        pixmap = self.thumbnails.pixmap(pane)
+        if pixmap is not None:
+            self.items[pane].setIcon(QIcon(pixmap))
+        else:
+            self.items[pane].setIcon(self.fallback_icons[pane] or QIcon())
+
+    def on_thumbnail_updated(self, pane):
+        if self.isVisible() and pane in self.items:
+            self.set_item_icon(pane)
+
+    def on_item_activated(self, item):
+        # A click can also activate the item; only act once
+        if not self.isVisible():
+            return
+        for pane, pane_item in self.items.items():
+            if pane_item is item:
+                if self.pane_chosen:
+                    self.pane_chosen(pane)
+                return
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key.Key_Escape:
+            if self.pane_chosen:
+                self.pane_chosen(None)
+            return
+        super().keyPressEvent(event)
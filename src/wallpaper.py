@@ -0,0 +1,127 @@
+"""
+Wallpaper scaling pipeline.
+
+Resize events on the wallpaper label are coalesced. While a resize is in
+progress the label shows a fast, low-quality scale; once it settles the
+smooth scale is done from a QImage on a worker thread. Finished results
+are kept in a small cache keyed by size, so going back to a common
+window size (maximized, restored, ...) is instant.
+"""
+from collections import OrderedDict
+from PyQt6.QtCore import (
+    QEvent,
+    QObject,
+    QRunnable,
+    QSize,
+    QThreadPool,
+    QTimer,
+    Qt,
+    pyqtSignal,
+)
+from PyQt6.QtGui import QImage, QPixmap
+
+
+class ScaleSignals(QObject):
+    finished = pyqtSignal(int, QSize, QImage)
+
+
+class ScaleTask(QRunnable):
+    def __init__(self, image, size, generation, signals):
+        super().__init__()
+        self.image = image
+        self.size = size
+        self.generation = generation
+        self.signals = signals
+
+    def run(self):
+        # QImage (unlike QPixmap) is safe to use off the UI thread
+        scaled = self.image.scaled(
+            self.size,
+            Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+            Qt.TransformationMode.SmoothTransformation,
+        )
+        self.signals.finished.emit(self.generation, self.size, scaled)
+
+
+class WallpaperPipeline(QObject):
+    def __init__(self, label, image_path, cache_entries=4, debounce_ms=120, parent=None):
+        super().__init__(parent)
+        self.label = label
+        self.cache_entries = cache_entries
+        self.cache = OrderedDict()  # (width, height) -> QPixmap
+        self.image = QImage()
+        self.pending_size = None
+        self.generation = 0
+
+        self.signals = ScaleSignals(self)
+        self.signals.finished.connect(self.on_scaled)
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.start_smooth_scale)
+
+        self.set_image(image_path)
+        label.installEventFilter(self)
+
+    def set_image(self, image_path):
+        """
+        Switch to a new wallpaper file. Returns False if it can't be loaded.
+        """
+        image = QImage(image_path)
+        if image.isNull():
+            return False
+        self.image = image
+        self.cache.clear()
+        # Results of scales started for the old image are dropped
+        self.generation += 1
+        self.request(self.label.size())
+        return True
+
+    def eventFilter(self, source, event):
+        if source is self.label and event.type() == QEvent.Type.Resize:
+            self.request(event.size())
+        return super().eventFilter(source, event)
+
+    def request(self, size):
+        if self.image.isNull() or size.isEmpty():
+            return
+        key = (size.width(), size.height())
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.timer.stop()
+            self.pending_size = None
+            self.label.setPixmap(cached)
+            return
+
+        # Cheap preview until the smooth scale for the final size is ready
+        preview = self.image.scaled(
+            size,
+            Qt.AspectRatioMode.KeepAspectRatioByExpanding,
+            Qt.TransformationMode.FastTransformation,
+        )
+        self.label.setPixmap(QPixmap.fromImage(preview))
+        self.pending_size = QSize(size)
+        self.timer.start()
+
+    def start_smooth_scale(self):
+        if self.pending_size is None:
+            return
+        self.generation += 1
+        task = ScaleTask(self.image, self.pending_size, self.generation, self.signals)
+        self.pending_size = None
+        QThreadPool.globalInstance().start(task)
+
+    def on_scaled(self, generation, size, image):
+        if generation != self.generation:
+            return
+        # QPixmap has to be created on the UI thread
+        pixmap = QPixmap.fromImage(image)
+        key = (size.width(), size.height())
+        self.cache[key] = pixmap
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_entries:
+            self.cache.popitem(last=False)
+        if self.label.size() == size:
+            self.label.setPixmap(pixmap)